@@ -0,0 +1 @@
+"""Benchmarks of the Watts Vision integration."""
@@ -0,0 +1,167 @@
+"""
+Record the traffic of a real account and replay it offline.
+
+record logs in, loads the account and refreshes it a few times like the
+integration does, through a RecordingTransport. The cassette has the
+credentials and tokens redacted but keeps the zones, devices and payload
+sizes of the account:
+
+    python -m benchmarks.cassette record --username me@example.com \\
+        --password secret --refreshes 5 account.json
+
+replay serves the cassette through a ReplayTransport, with the recorded
+latency or a multiple of it, and times the setup requests (login, loadData
+and the last communication check) and refreshes of the account:
+
+    python -m benchmarks.cassette replay account.json --time-scale 0
+
+Both run from the repository root with Home Assistant installed. --auth-url
+and --api-url point them at another cloud, such as benchmarks.mock_cloud.
+"""
+
+import argparse
+import asyncio
+import logging
+import tempfile
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from benchmarks.end_to_end import UNLIMITED_RATE, async_start_hass, measure
+from custom_components.watts_vision.const import DEFAULT_API_URL, DEFAULT_AUTH_URL
+from custom_components.watts_vision.transport import (
+    HttpTransport,
+    RecordingTransport,
+    ReplayTransport,
+)
+from custom_components.watts_vision.watts_api import WattsApi
+
+
+async def async_record(hass: HomeAssistant, args: argparse.Namespace) -> None:
+    """Record the setup and refreshes of an account."""
+    transport = RecordingTransport(HttpTransport(async_get_clientsession(hass)))
+    client = WattsApi(
+        hass,
+        args.username,
+        args.password,
+        auth_url=args.auth_url,
+        api_url=args.api_url,
+        transport=transport,
+    )
+    try:
+        if await client.getLoginToken() is None:
+            raise SystemExit("Login failed")
+        await client.loadData()
+        await client.refreshLastCommunication(0)
+        for refresh in range(args.refreshes):
+            await asyncio.sleep(args.interval)
+            print(f"Refresh {refresh + 1}/{args.refreshes}")
+            await client.reloadDevices()
+    finally:
+        client.cancelTokenRenewal()
+    await hass.async_add_executor_job(transport.save, args.cassette)
+    print(
+        f"Recorded {transport.exchanges} exchanges of "
+        f"{len(client.getDevices())} devices to {args.cassette}"
+    )
+
+
+async def async_replay(hass: HomeAssistant, args: argparse.Namespace) -> None:
+    """Time the setup and refreshes of a recorded account."""
+    clients = []
+
+    async def client() -> WattsApi:
+        transport = await hass.async_add_executor_job(
+            ReplayTransport.load, args.cassette, args.time_scale
+        )
+        replayed = WattsApi(
+            hass,
+            "replay",
+            "replay",
+            auth_url=args.auth_url,
+            api_url=args.api_url,
+            transport=transport,
+            rate_limit=UNLIMITED_RATE,
+            rate_burst=UNLIMITED_RATE,
+        )
+        clients.append(replayed)
+        return replayed
+
+    async def setup() -> None:
+        replayed = await client()
+        await replayed.getLoginToken()
+        if not await replayed.loadData():
+            raise RuntimeError("loadData failed, is the cassette complete?")
+        await replayed.refreshLastCommunication(0)
+
+    try:
+        setup_result = await measure(args.rounds, setup)
+        replayed = clients[-1]
+
+        async def refresh() -> None:
+            if not await replayed.reloadDevices():
+                raise RuntimeError("Refresh failed")
+
+        refresh_result = await measure(args.rounds, refresh)
+    finally:
+        for replayed in clients:
+            replayed.cancelTokenRenewal()
+
+    print(
+        f"{len(replayed.getSmartHomes())} homes, {len(replayed.getDevices())} "
+        f"devices, {replayed.snapshot_bytes / 1024:.0f} KiB per refresh, "
+        f"time scale {args.time_scale}"
+    )
+    for name, result in (("setup", setup_result), ("refresh", refresh_result)):
+        print(
+            f"{name:8} median {result['median_ms']:9.1f} ms"
+            f"  min {result['min_ms']:9.1f} ms  max {result['max_ms']:9.1f} ms"
+            f"  ({result['rounds']} rounds)"
+        )
+
+
+async def async_run(args: argparse.Namespace) -> None:
+    """Run the command in a bare Home Assistant."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+        try:
+            await args.command(hass, args)
+        finally:
+            await hass.async_stop(force=True)
+
+
+def main() -> None:
+    """Record or replay a cassette."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--auth-url", default=DEFAULT_AUTH_URL)
+    parser.add_argument("--api-url", default=DEFAULT_API_URL)
+    commands = parser.add_subparsers(required=True)
+
+    record = commands.add_parser("record", help="record the traffic of an account")
+    record.set_defaults(command=async_record)
+    record.add_argument("cassette")
+    record.add_argument("--username", required=True)
+    record.add_argument("--password", required=True)
+    record.add_argument("--refreshes", type=int, default=3)
+    record.add_argument(
+        "--interval", type=float, default=10, help="seconds between refreshes"
+    )
+
+    replay = commands.add_parser("replay", help="time a recorded account")
+    replay.set_defaults(command=async_replay)
+    replay.add_argument("cassette")
+    replay.add_argument(
+        "--time-scale",
+        type=float,
+        default=1.0,
+        help="multiplier of the recorded latency, 0 to answer at once",
+    )
+    replay.add_argument("--rounds", type=int, default=10)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(async_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+End-to-end timings of the integration against a local stand-in Watts cloud.
+
+Runs Home Assistant with the integration pointed at benchmarks.mock_cloud and
+measures, in wall-clock time:
+
+    load_data   WattsApi.loadData of the whole account, after the login
+    setup       setting up the config entry and its platforms
+    warm_setup  the same from the snapshot of the last run, the reconciling
+                refresh runs in the background and is not included
+    refresh     a steady-state refresh of the coordinator, nothing changed
+    command     a set_temperature until a poll confirms it, this includes
+                the debounce window of the command queue
+
+Everything runs offline and the account is generated the same way on every
+run, so the numbers of two commits are comparable on the same machine. Run
+from the repository root with Home Assistant installed:
+
+    python -m benchmarks.end_to_end --homes 4 --zones 25 --devices 4
+    python -m benchmarks.end_to_end --latency 0.05 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+
+from homeassistant import loader
+from homeassistant.config_entries import ConfigEntries, ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_SCAN_INTERVAL, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.core_config import async_process_ha_core_config
+from homeassistant.helpers import (
+    area_registry,
+    category_registry,
+    device_registry,
+    entity_registry,
+    floor_registry,
+    frame,
+    issue_registry,
+    label_registry,
+)
+from homeassistant.helpers.storage import Store
+from homeassistant.setup import async_setup_component
+
+from benchmarks.mock_cloud import MockWattsCloud
+from custom_components.watts_vision.const import (
+    CONF_API_URL,
+    CONF_AUTH_URL,
+    CONF_RATE_BURST,
+    CONF_RATE_LIMIT,
+    COORDINATOR,
+    DOMAIN,
+    SNAPSHOT_STORAGE_KEY,
+    STORAGE_VERSION,
+)
+from custom_components.watts_vision.watts_api import WattsApi
+
+# The stand-in cloud does not throttle, time the integration, not the limiter
+UNLIMITED_RATE = 1_000_000
+
+# Seconds a command may take until a poll confirms it
+COMMAND_TIMEOUT = 30
+
+
+async def async_start_hass(config_dir: str) -> HomeAssistant:
+    """Start a bare Home Assistant that can set up config entries."""
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    frame.async_setup(hass)
+    loader.async_setup(hass)
+    await asyncio.gather(
+        *(
+            registry.async_load(hass)
+            for registry in (
+                area_registry,
+                category_registry,
+                device_registry,
+                entity_registry,
+                floor_registry,
+                issue_registry,
+                label_registry,
+            )
+        )
+    )
+    await async_process_ha_core_config(hass, {})
+    hass.config_entries = ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    # The shared aiohttp session resolves through zeroconf, which needs network
+    await async_setup_component(hass, "network", {})
+    return hass
+
+
+def make_entry(cloud: MockWattsCloud, **data) -> ConfigEntry:
+    """Return a config entry of an account of the stand-in cloud."""
+    return ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="bench",
+        data={
+            CONF_USERNAME: "bench",
+            CONF_PASSWORD: "bench",
+            CONF_SCAN_INTERVAL: 300,
+            CONF_AUTH_URL: cloud.auth_url,
+            CONF_API_URL: cloud.api_url,
+            CONF_RATE_LIMIT: UNLIMITED_RATE,
+            CONF_RATE_BURST: UNLIMITED_RATE,
+            **data,
+        },
+        source="user",
+        options={},
+        unique_id=None,
+        discovery_keys={},
+        subentries_data=None,
+    )
+
+
+async def measure(
+    rounds: int,
+    run: Callable[[], Awaitable[float | None]],
+) -> dict[str, float]:
+    """Run a scenario, each run returns its own duration or None to time it."""
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        duration = await run()
+        durations.append(time.perf_counter() - start if duration is None else duration)
+    return {
+        "rounds": rounds,
+        "median_ms": statistics.median(durations) * 1000,
+        "min_ms": min(durations) * 1000,
+        "max_ms": max(durations) * 1000,
+    }
+
+
+async def bench_load_data(
+    hass: HomeAssistant, cloud: MockWattsCloud, rounds: int
+) -> dict[str, float]:
+    """Time loadData on a fresh, logged in client."""
+
+    async def run() -> float:
+        client = WattsApi(
+            hass,
+            "bench",
+            "bench",
+            auth_url=cloud.auth_url,
+            api_url=cloud.api_url,
+            rate_limit=UNLIMITED_RATE,
+            rate_burst=UNLIMITED_RATE,
+        )
+        await client.getLoginToken()
+        start = time.perf_counter()
+        if not await client.loadData():
+            raise RuntimeError("loadData failed")
+        duration = time.perf_counter() - start
+        client.cancelTokenRenewal()
+        return duration
+
+    return await measure(rounds, run)
+
+
+async def bench_setup(
+    hass: HomeAssistant, entry: ConfigEntry, rounds: int, warm: bool = False
+) -> dict[str, float]:
+    """Time the setup of the config entry and its platforms."""
+    snapshot = Store(hass, STORAGE_VERSION, f"{SNAPSHOT_STORAGE_KEY}.{entry.entry_id}")
+
+    async def run() -> float:
+        if entry.state.recoverable:
+            # Unloading writes the snapshot the next setup starts from
+            await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+        if not warm:
+            await snapshot.async_remove()
+        start = time.perf_counter()
+        if not await hass.config_entries.async_setup(entry.entry_id):
+            raise RuntimeError(f"Setup failed: {entry.reason}")
+        await hass.async_block_till_done()
+        duration = time.perf_counter() - start
+        # Let the reconciling refresh finish instead of cancelling it on unload
+        await hass.async_block_till_done(wait_background_tasks=True)
+        return duration
+
+    return await measure(rounds, run)
+
+
+async def bench_refresh(
+    hass: HomeAssistant, entry: ConfigEntry, rounds: int
+) -> dict[str, float]:
+    """Time a refresh of the coordinator, with all entities listening."""
+    coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+
+    async def run() -> None:
+        await coordinator.async_refresh()
+        if not coordinator.last_update_success:
+            raise RuntimeError("Refresh failed")
+
+    return await measure(rounds, run)
+
+
+async def bench_command(
+    hass: HomeAssistant, entry: ConfigEntry, cloud: MockWattsCloud, rounds: int
+) -> dict[str, float]:
+    """Time a set_temperature until a refresh has confirmed it."""
+    coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+    client = coordinator.client
+    registry = entity_registry.async_get(hass)
+    device = cloud.account[0]["zones"][0]["devices"][0]
+    entity_id = registry.async_get_entity_id(
+        "climate", DOMAIN, f"watts_thermostat_{device['id']}"
+    )
+    if entity_id is None:
+        raise RuntimeError("No thermostat entity found")
+    # Alternate between two setpoints in the unit Home Assistant shows them in
+    lowest = round(hass.states.get(entity_id).attributes["min_temp"])
+    temperatures = iter(lowest + 2 + index % 2 for index in range(rounds))
+
+    async def run() -> None:
+        confirmed = len(client.command_latencies)
+        await hass.services.async_call(
+            "climate",
+            "set_temperature",
+            {"entity_id": entity_id, "temperature": next(temperatures)},
+            blocking=True,
+        )
+        # The push leaves after the debounce window, poll until it is confirmed
+        try:
+            async with asyncio.timeout(COMMAND_TIMEOUT):
+                while len(client.command_latencies) == confirmed:
+                    await asyncio.sleep(0.05)
+                    await coordinator.async_refresh()
+        except TimeoutError:
+            raise RuntimeError(
+                f"Command not confirmed within {COMMAND_TIMEOUT} seconds"
+            ) from None
+
+    return await measure(rounds, run)
+
+
+async def async_run(args: argparse.Namespace) -> dict:
+    """Run all scenarios and return their results."""
+    cloud = MockWattsCloud(args.homes, args.zones, args.devices, args.latency)
+    await cloud.start()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+        try:
+            entry = make_entry(cloud)
+            await hass.config_entries.async_add(entry)
+            await hass.async_block_till_done()
+            results = {
+                "load_data": await bench_load_data(hass, cloud, args.rounds),
+                "setup": await bench_setup(hass, entry, args.rounds),
+                "warm_setup": await bench_setup(hass, entry, args.rounds, warm=True),
+                "refresh": await bench_refresh(hass, entry, args.rounds),
+                "command": await bench_command(hass, entry, cloud, args.command_rounds),
+            }
+            results["entities"] = len(hass.states.async_all())
+            await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+        finally:
+            await hass.async_stop(force=True)
+            await cloud.stop()
+    results["requests"] = cloud.calls
+    return results
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--homes", type=int, default=1)
+    parser.add_argument("--zones", type=int, default=10)
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--command-rounds", type=int, default=3)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    results = asyncio.run(async_run(args))
+    results["account"] = {
+        "homes": args.homes,
+        "zones": args.zones,
+        "devices": args.devices,
+        "latency": args.latency,
+    }
+
+    print(
+        f"{args.homes} homes x {args.zones} zones x {args.devices} devices, "
+        f"{args.latency * 1000:.0f} ms latency, {results['entities']} entities"
+    )
+    for name in ("load_data", "setup", "warm_setup", "refresh", "command"):
+        result = results[name]
+        print(
+            f"{name:10} median {result['median_ms']:9.1f} ms"
+            f"  min {result['min_ms']:9.1f} ms  max {result['max_ms']:9.1f} ms"
+            f"  ({result['rounds']} rounds)"
+        )
+    print(f"requests: {results['requests']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+CPU and memory of the in-process hot paths, with budgets.
+
+For accounts of 10, 100 and 1000 devices served by benchmarks.mock_cloud,
+measures the operations per second of:
+
+    get_device        WattsApi.getDevice
+    <Entity>          _update_state of every entity class, the work each
+                      entity does when the coordinator hands it new data
+    setup:<platform>  the async_setup_entry loop of each platform, per device
+    fan_out           a coordinator update of every entity, state writes
+                      included, per entity
+
+and with tracemalloc the bytes retained per device by a client after
+loadData and by the entities of all platforms.
+
+Every size is checked against BUDGETS and the run exits with status 1 when
+one is exceeded, so a regression of a hot path fails it. The time budgets
+are microseconds per operation, about four times what a laptop measures to
+leave room for slower machines. Run from the repository root with Home
+Assistant installed:
+
+    python -m benchmarks.hot_paths
+    python -m benchmarks.hot_paths --sizes 1000 --json results.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from benchmarks.end_to_end import UNLIMITED_RATE, async_start_hass, make_entry
+from benchmarks.mock_cloud import MockWattsCloud
+from custom_components.watts_vision import binary_sensor, climate, sensor
+from custom_components.watts_vision.const import (
+    CONF_ZONE_GROUPS,
+    COORDINATOR,
+    DOMAIN,
+)
+from custom_components.watts_vision.watts_api import WattsApi
+
+PLATFORMS = {
+    "binary_sensor": binary_sensor,
+    "climate": climate,
+    "sensor": sensor,
+}
+
+# Upper bounds, in microseconds per operation and in bytes per device
+BUDGETS = {
+    "get_device": 1,
+    "update_state": 50,
+    "setup": 50,
+    "fan_out": 75,
+    "client_bytes": 6_000,
+    "entity_bytes": 10_000,
+}
+
+# Seconds each measurement runs for at least
+MIN_DURATION = 0.2
+
+
+def account_shape(devices: int) -> tuple[int, int, int]:
+    """Return homes, zones per home and devices per zone of an account."""
+    homes = max(1, devices // 100)
+    return homes, devices // (homes * 2), 2
+
+
+async def ops_per_sec(operation: Callable[[], Awaitable[int]]) -> float:
+    """Repeat an operation returning its number of ops, return the best rate."""
+    best = 0.0
+    for _ in range(3):
+        ops = 0
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < MIN_DURATION:
+            ops += await operation()
+        best = max(best, ops / elapsed)
+    return best
+
+
+async def retained_bytes(build: Callable[[], Awaitable[Any]]) -> tuple[int, Any]:
+    """Return the bytes still allocated after build, and what it built."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = await build()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
+
+
+async def collect_entities(hass: HomeAssistant, entry: ConfigEntry) -> list:
+    """Run the async_setup_entry loop of every platform, return its entities."""
+    entities = []
+    for platform in PLATFORMS.values():
+        await platform.async_setup_entry(hass, entry, entities.extend)
+    return entities
+
+
+async def bench_size(hass: HomeAssistant, devices: int) -> dict:
+    """Measure the hot paths for an account of the given number of devices."""
+    cloud = MockWattsCloud(*account_shape(devices))
+    await cloud.start()
+    entry = make_entry(cloud, **{CONF_ZONE_GROUPS: True})
+    try:
+        await hass.config_entries.async_add(entry)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+        client = coordinator.client
+        devices = cloud.device_count
+        rates = {}
+
+        keys = list(client.getDevices())
+
+        async def get_device() -> int:
+            for smarthome, device in keys:
+                client.getDevice(smarthome, device)
+            return len(keys)
+
+        rates["get_device"] = await ops_per_sec(get_device)
+
+        by_class = {}
+        for entity in await collect_entities(hass, entry):
+            entity.hass = hass
+            by_class.setdefault(type(entity).__name__, []).append(entity)
+        for name, entities in by_class.items():
+
+            async def update_state(entities=entities) -> int:
+                for entity in entities:
+                    entity._update_state()
+                return len(entities)
+
+            rates[name] = await ops_per_sec(update_state)
+
+        for name, platform in PLATFORMS.items():
+
+            async def setup(platform=platform) -> int:
+                await platform.async_setup_entry(hass, entry, lambda *_: None)
+                return devices
+
+            rates[f"setup:{name}"] = await ops_per_sec(setup)
+
+        listeners = len(coordinator._listeners)
+
+        async def fan_out() -> int:
+            coordinator.async_update_listeners()
+            return listeners
+
+        rates["fan_out"] = await ops_per_sec(fan_out)
+
+        async def load() -> WattsApi:
+            loaded = WattsApi(
+                hass,
+                "bench",
+                "bench",
+                auth_url=cloud.auth_url,
+                api_url=cloud.api_url,
+                rate_limit=UNLIMITED_RATE,
+                rate_burst=UNLIMITED_RATE,
+            )
+            await loaded.getLoginToken()
+            await loaded.loadData()
+            loaded.cancelTokenRenewal()
+            return loaded
+
+        client_bytes, _ = await retained_bytes(load)
+        entity_bytes, _ = await retained_bytes(lambda: collect_entities(hass, entry))
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        await hass.config_entries.async_remove(entry.entry_id)
+    finally:
+        await cloud.stop()
+
+    return {
+        "devices": devices,
+        "entities": listeners,
+        "ops_per_sec": rates,
+        "bytes_per_device": {
+            "client": client_bytes / devices,
+            "entities": entity_bytes / devices,
+        },
+    }
+
+
+def over_budget(result: dict) -> list[str]:
+    """Return the budgets a result exceeds."""
+
+    def check(name: str, value: float, budget: float, unit: str) -> None:
+        if value > budget:
+            exceeded.append(f"{name}: {value:.1f} {unit} > {budget} {unit}")
+
+    exceeded = []
+    for name, rate in result["ops_per_sec"].items():
+        if name.startswith("setup:"):
+            budget = BUDGETS["setup"]
+        elif name in ("get_device", "fan_out"):
+            budget = BUDGETS[name]
+        else:
+            budget = BUDGETS["update_state"]
+        check(name, 1e6 / rate, budget, "us")
+    memory = result["bytes_per_device"]
+    check("client memory", memory["client"], BUDGETS["client_bytes"], "B/device")
+    check("entity memory", memory["entities"], BUDGETS["entity_bytes"], "B/device")
+    return exceeded
+
+
+async def async_run(sizes: list[int]) -> dict[int, dict]:
+    """Measure every size in a single Home Assistant."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+        try:
+            return {size: await bench_size(hass, size) for size in sizes}
+        finally:
+            await hass.async_stop(force=True)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument(
+        "--no-budgets", action="store_true", help="report without enforcing budgets"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    results = asyncio.run(async_run(args.sizes))
+
+    exceeded = []
+    for size, result in results.items():
+        print(f"{result['devices']} devices, {result['entities']} entities")
+        for name, rate in result["ops_per_sec"].items():
+            print(f"  {name:40} {rate:12,.0f} ops/s {1e6 / rate:9.2f} us")
+        memory = result["bytes_per_device"]
+        print(f"  {'client memory':40} {memory['client']:12,.0f} B/device")
+        print(f"  {'entity memory':40} {memory['entities']:12,.0f} B/device")
+        exceeded.extend(f"{size} devices, {error}" for error in over_budget(result))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if exceeded and not args.no_budgets:
+        print("Over budget:")
+        for error in exceeded:
+            print(f"  {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Local stand-in for the Watts cloud, serving a synthetic account.
+
+Implements the token, user/read, smarthome/read, query/push and
+check_last_connexion endpoints for an account of homes x zones x devices,
+with an optional latency added to every request. Pushed commands are applied
+to the account, so the next smarthome/read reports them like the real cloud
+does once the thermostat took them.
+
+Point a WattsApi or a config entry at it through the auth_url and api_url
+it serves. It can also be run on its own for manual testing:
+
+    python -m benchmarks.mock_cloud --homes 2 --zones 10 --port 8765
+"""
+
+import argparse
+import asyncio
+import contextlib
+import re
+
+from aiohttp import web
+
+from benchmarks.refresh_cpu import make_device
+
+OK = {"code": "1", "key": "OK", "value": "OK"}
+
+
+def make_account(homes: int, zones: int, devices: int) -> list[dict]:
+    """Return the smart homes of a synthetic account, with their zones."""
+    return [
+        {
+            "smarthome_id": f"home{home}",
+            "label": f"Home {home}",
+            "mac_address": f"00:00:00:00:{home // 256:02x}:{home % 256:02x}",
+            "zones": [
+                {
+                    "zone_label": f"Zone {zone}",
+                    "num_zone": str(zone),
+                    "devices": [
+                        make_device(home, zone, device) for device in range(devices)
+                    ],
+                }
+                for zone in range(zones)
+            ],
+        }
+        for home in range(homes)
+    ]
+
+
+class MockWattsCloud:
+    """An aiohttp server answering like the Watts cloud."""
+
+    def __init__(
+        self, homes: int = 1, zones: int = 10, devices: int = 1, latency: float = 0.0
+    ):
+        self.account = make_account(homes, zones, devices)
+        # Seconds added to every request
+        self.latency = latency
+        # Endpoint -> number of requests
+        self.calls: dict[str, int] = {}
+        self.pushes: list[dict] = []
+        self._homes = {home["smarthome_id"]: home for home in self.account}
+        self._devices = {
+            (home["smarthome_id"], device["id_device"]): device
+            for home in self.account
+            for zone in home["zones"]
+            for device in zone["devices"]
+        }
+        self._runner = None
+        self.url = None
+
+        self.app = web.Application()
+        self.app.router.add_post(
+            "/realms/watts/protocol/openid-connect/token", self._token
+        )
+        self.app.router.add_post("/api/v0.1/human/user/read/", self._user_read)
+        self.app.router.add_post(
+            "/api/v0.1/human/smarthome/read/", self._smarthome_read
+        )
+        self.app.router.add_post("/api/v0.1/human/query/push/", self._push)
+        self.app.router.add_post(
+            "/api/v0.1/human/sandbox/check_last_connexion/", self._last_connexion
+        )
+
+    @property
+    def auth_url(self) -> str:
+        """Base URL of the token endpoint."""
+        return self.url
+
+    @property
+    def api_url(self) -> str:
+        """Base URL of the API endpoints."""
+        return f"{self.url}/api/v0.1/human"
+
+    @property
+    def device_count(self) -> int:
+        """Number of devices in the account."""
+        return len(self._devices)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Start serving, on a free port unless one is given."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.url = f"http://{host}:{self._runner.addresses[0][1]}"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, endpoint: str, request: web.Request) -> dict:
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return dict(await request.post())
+
+    @staticmethod
+    def _ok(data: dict) -> web.Response:
+        return web.json_response({"code": OK, "data": data})
+
+    async def _token(self, request: web.Request) -> web.Response:
+        await self._handle("token", request)
+        return web.json_response(
+            {
+                "access_token": "access",
+                "expires_in": 300,
+                "refresh_token": "refresh",
+                "refresh_expires_in": 1800,
+            }
+        )
+
+    async def _user_read(self, request: web.Request) -> web.Response:
+        await self._handle("user/read", request)
+        return self._ok(
+            {
+                "smarthomes": [
+                    {key: value for key, value in home.items() if key != "zones"}
+                    for home in self.account
+                ]
+            }
+        )
+
+    async def _smarthome_read(self, request: web.Request) -> web.Response:
+        form = await self._handle("smarthome/read", request)
+        home = self._homes.get(form.get("smarthome_id"))
+        if home is None:
+            raise web.HTTPNotFound
+        return self._ok({"zones": home["zones"]})
+
+    async def _push(self, request: web.Request) -> web.Response:
+        form = await self._handle("query/push", request)
+        device = self._devices.get(
+            (form.get("smarthome_id"), form.get("query[id_device]"))
+        )
+        if device is None:
+            raise web.HTTPNotFound
+        self.pushes.append(form)
+        for key, value in form.items():
+            field = re.fullmatch(r"query\[(gv_mode|time_boost|consigne_\w+)\]", key)
+            if field is not None:
+                device[field.group(1)] = value
+        return self._ok({})
+
+    async def _last_connexion(self, request: web.Request) -> web.Response:
+        await self._handle("check_last_connexion", request)
+        return self._ok(
+            {"diffObj": {"days": 0, "hours": 0, "minutes": 1, "seconds": 5}}
+        )
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    cloud = MockWattsCloud(args.homes, args.zones, args.devices, args.latency)
+    await cloud.start(args.host, args.port)
+    print(f"Serving {cloud.device_count} devices")
+    print(f"auth_url: {cloud.auth_url}")
+    print(f"api_url:  {cloud.api_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await cloud.stop()
+
+
+def main() -> None:
+    """Serve a synthetic account until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--homes", type=int, default=1)
+    parser.add_argument("--zones", type=int, default=10)
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+CPU spent decoding the smarthome/read responses of one refresh.
+
+Compares the previous path, where aiohttp decoded every body with the
+standard json module once in check_response and once more in the caller,
+with WattsApi.parse_response, which decodes each body once with Home
+Assistant's json_loads. The idle line is a refresh where every body is
+byte-identical to the previous one and only its fingerprint is computed.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.refresh_cpu --homes 4 --zones 25 --devices 4
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.watts_vision.watts_api import WattsApi
+
+
+def make_device(home: int, zone: int, device: int) -> dict:
+    """Return a device as the smarthome/read endpoint reports it."""
+    return {
+        "id": f"{home}-{zone}-{device}",
+        "id_device": f"C{zone:03}{device:02}",
+        "nom_appareil": f"Thermostat {zone} {device}",
+        "temperature_air": "680",
+        "temperature_sol": "0",
+        "min_set_point": "410",
+        "max_set_point": "860",
+        "gv_mode": "0",
+        "nv_mode": "0",
+        "heat_cool": "0",
+        "heating_up": "0",
+        "consigne_eco": "600",
+        "consigne_hg": "446",
+        "consigne_confort": "680",
+        "consigne_boost": "700",
+        "consigne_manuel": "680",
+        "time_boost": "0",
+        "error_code": 0,
+        "bundle_id": "0",
+    }
+
+
+def make_body(home: int, zones: int, devices: int) -> bytes:
+    """Return the raw smarthome/read response of a home."""
+    return json.dumps(
+        {
+            "code": {"code": "1", "key": "OK", "value": "OK"},
+            "data": {
+                "zones": [
+                    {
+                        "zone_label": f"Zone {zone}",
+                        "num_zone": str(zone),
+                        "devices": [
+                            make_device(home, zone, device) for device in range(devices)
+                        ],
+                    }
+                    for zone in range(zones)
+                ]
+            },
+        }
+    ).encode()
+
+
+def decode_before(body: bytes) -> list | None:
+    """Decode like before, check_response and the caller both called .json()."""
+    if "OK" in json.loads(body.decode())["code"]["key"]:
+        return json.loads(body.decode())["data"]["zones"]
+    return None
+
+
+def decode_after(body: bytes) -> list:
+    """Decode once into the response envelope."""
+    return WattsApi.parse_response(200, body).data["zones"]
+
+
+def decode_unchanged(body: bytes) -> None:
+    """Fingerprint a body that turns out to be identical to the last one."""
+    # A fresh view, bytes objects cache their hash but responses are new
+    hash(memoryview(body))
+
+
+def cpu_per_refresh(
+    decode: Callable[[bytes], list | None], bodies: list[bytes], iterations: int
+) -> float:
+    """Return the CPU seconds spent decoding all bodies of one refresh."""
+    start = time.process_time()
+    for _ in range(iterations):
+        for body in bodies:
+            decode(body)
+    return (time.process_time() - start) / iterations
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--homes", type=int, default=4)
+    parser.add_argument("--zones", type=int, default=25)
+    parser.add_argument("--devices", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    bodies = [make_body(home, args.zones, args.devices) for home in range(args.homes)]
+    if decode_before(bodies[0]) != decode_after(bodies[0]):
+        sys.exit("Both paths must decode the same zones")
+
+    before = cpu_per_refresh(decode_before, bodies, args.iterations)
+    after = cpu_per_refresh(decode_after, bodies, args.iterations)
+    idle = cpu_per_refresh(decode_unchanged, bodies, args.iterations)
+    print(
+        f"{args.homes} homes x {args.zones} zones x {args.devices} devices, "
+        f"{sum(map(len, bodies)) / 1024:.0f} KiB per refresh"
+    )
+    print(f"before: {before * 1000:8.3f} ms CPU per refresh")
+    print(f"after:  {after * 1000:8.3f} ms CPU per refresh ({before / after:.1f}x)")
+    print(f"idle:   {idle * 1000:8.3f} ms CPU per refresh ({before / idle:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,41 +10,199 @@ from homeassistant.const import (
     CONF_USERNAME,
     Platform,
 )
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.storage import Store
 
-from .const import API_CLIENT, DOMAIN
+from .const import (
+    API_CLIENT,
+    CONF_API_URL,
+    CONF_AUTH_URL,
+    CONF_COMMAND_DEBOUNCE,
+    CONF_LAST_COMMUNICATION_TTL,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_RATE_BURST,
+    CONF_RATE_LIMIT,
+    COORDINATOR,
+    DEFAULT_API_URL,
+    DEFAULT_AUTH_URL,
+    DEFAULT_COMMAND_DEBOUNCE,
+    DEFAULT_LAST_COMMUNICATION_TTL,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_RATE_BURST,
+    DEFAULT_RATE_LIMIT,
+    DOMAIN,
+    PENDING_TOKENS,
+    RATE_LIMITER,
+    RATE_LIMITER_USERS,
+    SNAPSHOT_STORAGE_KEY,
+    SNAPSHOT_STORE,
+    STORAGE_VERSION,
+    TOKEN_STORAGE_KEY,
+    TOKEN_STORE,
+)
+from .coordinator import WattsVisionCoordinator
+from .exceptions import WattsApiError
+from .rate_limiter import RateLimiter
 from .watts_api import WattsApi
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.BINARY_SENSOR, Platform.SENSOR, Platform.CLIMATE]
 
+# Seconds to batch token writes to storage
+TOKEN_SAVE_DELAY = 1
+# Seconds to batch snapshot writes, the homes of a refresh answer one by one
+SNAPSHOT_SAVE_DELAY = 10
+
+
+def _token_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the storage holding the tokens of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{TOKEN_STORAGE_KEY}.{entry.entry_id}")
+
+
+def _snapshot_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the storage holding the device snapshot of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{SNAPSHOT_STORAGE_KEY}.{entry.entry_id}")
+
+
+def _acquire_rate_limiter(hass: HomeAssistant, entry: ConfigEntry) -> RateLimiter:
+    """Return the rate limiter shared by all accounts, with this entry as a user."""
+    users = hass.data[DOMAIN].setdefault(RATE_LIMITER_USERS, {})
+    users[entry.entry_id] = (
+        entry.data.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT) / 60,
+        entry.data.get(CONF_RATE_BURST, DEFAULT_RATE_BURST),
+    )
+    if (limiter := hass.data[DOMAIN].get(RATE_LIMITER)) is None:
+        limiter = hass.data[DOMAIN][RATE_LIMITER] = RateLimiter(*users[entry.entry_id])
+    _configure_rate_limiter(hass)
+    return limiter
+
+
+def _release_rate_limiter(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Stop using the shared rate limiter, it goes away with its last user."""
+    users = hass.data[DOMAIN].get(RATE_LIMITER_USERS, {})
+    users.pop(entry.entry_id, None)
+    if users:
+        _configure_rate_limiter(hass)
+    else:
+        hass.data[DOMAIN].pop(RATE_LIMITER_USERS, None)
+        hass.data[DOMAIN].pop(RATE_LIMITER, None)
+
+
+def _configure_rate_limiter(hass: HomeAssistant) -> None:
+    """Apply the strictest rate and burst of the accounts using the limiter."""
+    # The accounts share one cloud, no account may override the limits of another
+    users = hass.data[DOMAIN][RATE_LIMITER_USERS].values()
+    hass.data[DOMAIN][RATE_LIMITER].configure(
+        min(rate for rate, _ in users), min(burst for _, burst in users)
+    )
+
+
+def _refresh_stagger(
+    hass: HomeAssistant, entry: ConfigEntry, interval: timedelta
+) -> timedelta:
+    """
+    Return the offset of the refresh schedule of an account.
+
+    The accounts are spread evenly over the scan interval, in the order of
+    their config entries, so they do not all poll the cloud at once.
+    """
+    entry_ids = [
+        other.entry_id
+        for other in hass.config_entries.async_entries(
+            DOMAIN, include_ignore=False, include_disabled=False
+        )
+    ]
+    if entry.entry_id not in entry_ids:
+        return timedelta(0)
+    return interval * entry_ids.index(entry.entry_id) / len(entry_ids)
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Watts Vision from a config entry."""
     _LOGGER.debug("Set up Watts Vision")
     hass.data.setdefault(DOMAIN, {})
 
-    client = WattsApi(hass, entry.data[CONF_USERNAME], entry.data[CONF_PASSWORD])
-
+    client = WattsApi(
+        hass,
+        entry.data[CONF_USERNAME],
+        entry.data[CONF_PASSWORD],
+        auth_url=entry.data.get(CONF_AUTH_URL, DEFAULT_AUTH_URL),
+        api_url=entry.data.get(CONF_API_URL, DEFAULT_API_URL),
+        max_concurrent_requests=entry.data.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        ),
+        command_debounce=entry.data.get(
+            CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE
+        ),
+        rate_limiter=_acquire_rate_limiter(hass, entry),
+    )
+    loaded = False
     try:
-        await hass.async_add_executor_job(client.getLoginToken)
-    except Exception as exception:  # pylint: disable=broad-except
-        _LOGGER.exception(exception)
-        return False
+        loaded = await _async_setup_client(hass, entry, client)
+    finally:
+        if not loaded:
+            client.cancelTokenRenewal()
+            _release_rate_limiter(hass, entry)
+    return loaded
 
-    await hass.async_add_executor_job(client.loadData)
 
-    hass.data[DOMAIN][API_CLIENT] = client
+async def _async_setup_client(
+    hass: HomeAssistant, entry: ConfigEntry, client: WattsApi
+) -> bool:
+    """Log in, load the account and start its refresh cycle and platforms."""
 
-    hass.async_create_task(
-        hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # Reuse the tokens of the config flow or of the previous run when still valid
+    store = _token_store(hass, entry)
+    tokens = (
+        hass.data[DOMAIN].get(PENDING_TOKENS, {}).pop(entry.data[CONF_USERNAME], None)
+        or await store.async_load()
     )
 
-    async def refresh_devices(event_time):
-        _LOGGER.debug("Refreshing devices")
-        await hass.async_add_executor_job(client.reloadDevices)
+    @callback
+    def save_tokens() -> None:
+        store.async_delay_save(client.exportTokens, TOKEN_SAVE_DELAY)
+
+    client.setTokenListener(save_tokens)
+
+    snapshot_store = _snapshot_store(hass, entry)
+
+    @callback
+    def save_snapshot() -> None:
+        snapshot_store.async_delay_save(client.exportSnapshot, SNAPSHOT_SAVE_DELAY)
+
+    client.setSnapshotListener(save_snapshot)
+
+    # With the devices of the last run the entities need no request to start,
+    # the first refresh logs in if needed and reconciles them in the background
+    snapshot = await snapshot_store.async_load()
+    warm_start = snapshot is not None and client.restoreSnapshot(snapshot)
+
+    if tokens and client.restoreTokens(tokens):
+        _LOGGER.debug("Reusing stored tokens")
+        save_tokens()
+    elif not warm_start:
+        try:
+            await client.getLoginToken()
+        except WattsApiError as exception:
+            raise ConfigEntryNotReady(exception) from exception
+        except Exception as exception:  # pylint: disable=broad-except
+            _LOGGER.exception(exception)
+            return False
+
+    if warm_start:
+        _LOGGER.debug("Starting from the stored snapshot")
+    else:
+        try:
+            await client.loadData()
+        except WattsApiError as exception:
+            raise ConfigEntryNotReady(exception) from exception
+        await client.refreshLastCommunication(0)
 
     # If scan interval is not found in config, set it to 300 seconds
     if CONF_SCAN_INTERVAL not in entry.data:
@@ -56,7 +214,44 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     SCAN_INTERVAL = timedelta(seconds=interval)
 
     _LOGGER.debug("Setting up refresh interval to %s", SCAN_INTERVAL)
-    async_track_time_interval(hass, refresh_devices, SCAN_INTERVAL)
+    coordinator = WattsVisionCoordinator(
+        hass,
+        entry,
+        client,
+        SCAN_INTERVAL,
+        timedelta(
+            seconds=entry.data.get(CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL)
+        ),
+        timedelta(
+            seconds=entry.data.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL)
+        ),
+        timedelta(
+            seconds=entry.data.get(
+                CONF_LAST_COMMUNICATION_TTL, DEFAULT_LAST_COMMUNICATION_TTL
+            )
+        ),
+        _refresh_stagger(hass, entry, SCAN_INTERVAL),
+    )
+    # Start the refresh cycle from what loadData fetched or the snapshot held
+    coordinator.async_set_updated_data(client.getSmartHomes())
+    if warm_start:
+        # The account may have gained homes since the snapshot was taken, the
+        # coordinator reloads the entry to add their entities
+        coordinator.async_reload_homes()
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), "watts_vision snapshot reconcile"
+        )
+
+    hass.data[DOMAIN][entry.entry_id] = {
+        API_CLIENT: client,
+        COORDINATOR: coordinator,
+        SNAPSHOT_STORE: snapshot_store,
+        TOKEN_STORE: store,
+    }
+
+    hass.async_create_task(
+        hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    )
 
     return True
 
@@ -65,5 +260,20 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.debug("Unloading Watts Vision")
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(API_CLIENT)
+        data = hass.data[DOMAIN].pop(entry.entry_id)
+        client: WattsApi = data[API_CLIENT]
+        client.cancelTokenRenewal()
+        await client.flushCommands()
+        # Write now rather than after the delay, a reload starts from them
+        if (tokens := client.exportTokens()) is not None:
+            await data[TOKEN_STORE].async_save(tokens)
+        if (snapshot := client.exportSnapshot()) is not None:
+            await data[SNAPSHOT_STORE].async_save(snapshot)
+        _release_rate_limiter(hass, entry)
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored tokens and snapshot of a deleted config entry."""
+    await _token_store(hass, entry).async_remove()
+    await _snapshot_store(hass, entry).async_remove()
@@ -1,53 +1,54 @@
 import logging
 from collections.abc import Callable
-from datetime import timedelta
 
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
-from .const import API_CLIENT, DOMAIN
-from .watts_api import WattsApi
+from .const import COORDINATOR, DOMAIN
+from .coordinator import WattsVisionCoordinator
+from .entity import WattsVisionEntity
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(seconds=120)
-
 
 async def async_setup_entry(
     hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: Callable
 ):
     """Set up the binary_sensor platform."""
-    wattsClient: WattsApi = hass.data[DOMAIN][API_CLIENT]
+    coordinator: WattsVisionCoordinator = hass.data[DOMAIN][config_entry.entry_id][
+        COORDINATOR
+    ]
 
-    smartHomes = wattsClient.getSmartHomes()
+    smartHomes = coordinator.client.getSmartHomes()
 
     sensors = []
 
     if smartHomes is not None:
         for y in range(len(smartHomes)):
-            if smartHomes[y]["zones"] is not None:
+            if smartHomes[y].get("zones") is not None:
                 for z in range(len(smartHomes[y]["zones"])):
                     if smartHomes[y]["zones"][z]["devices"] is not None:
                         for x in range(len(smartHomes[y]["zones"][z]["devices"])):
                             sensors.append(
                                 WattsVisionHeatingBinarySensor(
-                                    wattsClient,
+                                    coordinator,
                                     smartHomes[y]["smarthome_id"],
-                                    smartHomes[y]["zones"][z]["devices"][x]["id"],
+                                    smartHomes[y]["zones"][z]["devices"][x].id,
                                     smartHomes[y]["zones"][z]["zone_label"],
                                 )
                             )
 
-    async_add_entities(sensors, update_before_add=True)
+    async_add_entities(sensors)
 
 
-class WattsVisionHeatingBinarySensor(BinarySensorEntity):
+class WattsVisionHeatingBinarySensor(WattsVisionEntity, BinarySensorEntity):
     """Representation of a Watts Vision thermostat."""
 
-    def __init__(self, wattsClient: WattsApi, smartHome: str, id: str, zone: str):
-        super().__init__()
-        self.client = wattsClient
+    def __init__(
+        self, coordinator: WattsVisionCoordinator, smartHome: str, id: str, zone: str
+    ):
+        super().__init__(coordinator, (smartHome, id))
         self.smartHome = smartHome
         self.id = id
         self.zone = zone
@@ -83,13 +84,13 @@ class WattsVisionHeatingBinarySensor(BinarySensorEntity):
             "via_device": (DOMAIN, self.smartHome),
         }
 
-    async def async_update(self):
+    @callback
+    def _update_state(self):
         # try:
-        smartHomeDevice = self.client.getDevice(self.smartHome, self.id)
-        if smartHomeDevice["heating_up"] == "0":
-            self._state = False
-        else:
-            self._state = True
+        smartHomeDevice = self._get_device(self.smartHome, self.id)
+        if smartHomeDevice is None:
+            return
+        self._state = smartHomeDevice.heating_up
         # except:
         #     self._available = False
         #     _LOGGER.exception("Error retrieving data.")
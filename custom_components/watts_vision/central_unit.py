@@ -1,22 +1,29 @@
 """Watts Vision sensor platform -- central unit."""
 
-from homeassistant.components.sensor import SensorEntity
+from datetime import datetime
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
+from homeassistant.core import callback
 
 from .const import DOMAIN
-from .watts_api import WattsApi
+from .coordinator import WattsVisionCoordinator
+from .entity import WattsVisionEntity
 
 
-class WattsVisionLastCommunicationSensor(SensorEntity):
+class WattsVisionLastCommunicationSensor(WattsVisionEntity, SensorEntity):
     def __init__(
-        self, wattsClient: WattsApi, smartHome: str, label: str, mac_address: str
+        self,
+        coordinator: WattsVisionCoordinator,
+        smartHome: str,
+        label: str,
+        mac_address: str,
     ):
-        super().__init__()
-        self.client = wattsClient
+        # The refresh cycle checks the central unit, see refreshLastCommunication
+        super().__init__(coordinator, (smartHome, None))
         self.smartHome = smartHome
         self._label = label
         self._name = "Last communication " + self._label
         self._state = None
-        self._available = True
         self._mac_address = mac_address
 
     @property
@@ -30,7 +37,11 @@ class WattsVisionLastCommunicationSensor(SensorEntity):
         return self._name
 
     @property
-    def state(self) -> str | None:
+    def device_class(self):
+        return SensorDeviceClass.TIMESTAMP
+
+    @property
+    def native_value(self) -> datetime | None:
         return self._state
 
     @property
@@ -46,14 +57,6 @@ class WattsVisionLastCommunicationSensor(SensorEntity):
             "connections": {("mac", self._mac_address)},
         }
 
-    async def async_update(self):
-        data = await self.hass.async_add_executor_job(
-            self.client.getLastCommunication, self.smartHome
-        )
-
-        self._state = "{} days, {} hours, {} minutes and {} seconds.".format(
-            data["diffObj"]["days"],
-            data["diffObj"]["hours"],
-            data["diffObj"]["minutes"],
-            data["diffObj"]["seconds"],
-        )
+    @callback
+    def _update_state(self):
+        self._state = self.client.getLastCommunicationTime(self.smartHome)
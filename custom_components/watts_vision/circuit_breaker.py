@@ -0,0 +1,116 @@
+"""Circuit breaker guarding the Watts Vision cloud."""
+
+import logging
+import time
+from collections.abc import Callable
+from enum import StrEnum
+
+from .exceptions import CircuitOpenError
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CircuitState(StrEnum):
+    """State of the circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling the cloud after repeated failures.
+
+    The circuit opens once ``failure_threshold`` requests in a row have failed
+    and rejects every request for ``reset_timeout`` seconds. After that a
+    single probe is let through: when it succeeds the circuit closes again,
+    otherwise it stays open for another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._trips = 0
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def state(self) -> CircuitState:
+        """Return the current state, moving to half open once the timeout ends."""
+        if (
+            self._state is CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self._reset_timeout
+        ):
+            self._state = CircuitState.HALF_OPEN
+        return self._state
+
+    @property
+    def failures(self) -> int:
+        """Number of failed requests in a row."""
+        return self._failures
+
+    @property
+    def trips(self) -> int:
+        """Number of times the circuit opened."""
+        return self._trips
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener when the circuit opens or closes, returns a remover."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
+
+    def allow(self) -> bool:
+        """
+        Raise CircuitOpenError when the request may not be sent.
+
+        Returns True when the request is the probe of a half open circuit,
+        the caller then has to call release once the probe is over.
+        """
+        state = self.state
+        if state is CircuitState.CLOSED:
+            return False
+        if state is CircuitState.HALF_OPEN and not self._probing:
+            _LOGGER.debug("Circuit half open, sending a probe")
+            self._probing = True
+            return True
+        raise CircuitOpenError("Watts Vision cloud is unavailable, circuit is open")
+
+    def release(self) -> None:
+        """Let another request probe, the probe ended with or without a result."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        self._failures = 0
+        self._probing = False
+        if self._state is not CircuitState.CLOSED:
+            _LOGGER.info("Watts Vision cloud is reachable again, closing circuit")
+            self._state = CircuitState.CLOSED
+            self._notify()
+
+    def record_failure(self) -> None:
+        """Count a failed request and open the circuit when needed."""
+        self._failures += 1
+        if self._probing or (
+            self._state is CircuitState.CLOSED
+            and self._failures >= self._failure_threshold
+        ):
+            if self._state is CircuitState.CLOSED:
+                _LOGGER.warning(
+                    "Watts Vision cloud failed %s times in a row, opening circuit for %s seconds",
+                    self._failures,
+                    self._reset_timeout,
+                )
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+            self._trips += 1
+            self._notify()
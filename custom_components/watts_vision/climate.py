@@ -1,4 +1,4 @@
-import functools
+import asyncio
 import logging
 from collections.abc import Callable
 
@@ -11,10 +11,11 @@ from homeassistant.components.climate import (
 )
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
 from .const import (
-    API_CLIENT,
+    CONF_ZONE_GROUPS,
+    COORDINATOR,
     DOMAIN,
     _AVAILABLE_HEAT_MODES,
     _AVAILABLE_TEMP_TYPES,
@@ -23,7 +24,8 @@ from .const import (
     _HEAT_MODE_TO_DEVICE,
     HeatMode,
 )
-from .watts_api import WattsApi
+from .coordinator import WattsVisionCoordinator
+from .entity import WattsVisionEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,41 +34,65 @@ async def async_setup_entry(
     hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: Callable
 ):
     """Set up the climate platform."""
-    wattsClient: WattsApi = hass.data[DOMAIN][API_CLIENT]
+    coordinator: WattsVisionCoordinator = hass.data[DOMAIN][config_entry.entry_id][
+        COORDINATOR
+    ]
 
-    smartHomes = wattsClient.getSmartHomes()
+    smartHomes = coordinator.client.getSmartHomes()
 
     devices = []
 
     if smartHomes is not None:
         for y in range(len(smartHomes)):
-            if smartHomes[y]["zones"] is not None:
+            if smartHomes[y].get("zones") is not None:
                 for z in range(len(smartHomes[y]["zones"])):
                     if smartHomes[y]["zones"][z]["devices"] is not None:
                         for x in range(len(smartHomes[y]["zones"][z]["devices"])):
                             devices.append(
                                 WattsThermostat(
-                                    wattsClient,
+                                    coordinator,
                                     smartHomes[y]["smarthome_id"],
-                                    smartHomes[y]["zones"][z]["devices"][x]["id"],
-                                    smartHomes[y]["zones"][z]["devices"][x][
-                                        "id_device"
-                                    ],
+                                    smartHomes[y]["zones"][z]["devices"][x].id,
+                                    smartHomes[y]["zones"][z]["devices"][x].id_device,
                                     smartHomes[y]["zones"][z]["zone_label"],
                                 )
                             )
 
-    async_add_entities(devices, update_before_add=True)
-
-
-class WattsThermostat(ClimateEntity):
+    groups = []
+    thermostats = {}
+    for device in devices:
+        thermostats.setdefault(device.smartHome, []).append(device)
+    if smartHomes is not None:
+        for smartHome in smartHomes:
+            members = thermostats.get(smartHome["smarthome_id"], [])
+            if len(members) > 1:
+                groups.append(WattsThermostatGroup(coordinator, smartHome, members))
+            if not config_entry.data.get(CONF_ZONE_GROUPS, False):
+                continue
+            zones = {}
+            for member in members:
+                zones.setdefault(member.zone, []).append(member)
+            for zone, zoneMembers in zones.items():
+                if len(zoneMembers) > 1:
+                    groups.append(
+                        WattsThermostatGroup(coordinator, smartHome, zoneMembers, zone)
+                    )
+
+    async_add_entities(devices + groups)
+
+
+class WattsThermostat(WattsVisionEntity, ClimateEntity):
     """"""
 
     def __init__(
-        self, wattsClient: WattsApi, smartHome: str, id: str, deviceID: str, zone: str
+        self,
+        coordinator: WattsVisionCoordinator,
+        smartHome: str,
+        id: str,
+        deviceID: str,
+        zone: str,
     ):
-        super().__init__()
-        self.client = wattsClient
+        super().__init__(coordinator, (smartHome, id))
         self.smartHome = smartHome
         self.id = id
         self.zone = zone
@@ -129,60 +155,41 @@ class WattsThermostat(ClimateEntity):
             "via_device": (DOMAIN, self.smartHome),
         }
 
-    async def async_update(self):
+    @callback
+    def _update_state(self):
         # try:
-        smartHomeDevice = self.client.getDevice(self.smartHome, self.id)
-
-        self._attr_current_temperature = float(smartHomeDevice["temperature_air"]) / 10
-        if smartHomeDevice["gv_mode"] != "2":
-            self._attr_min_temp = float(smartHomeDevice["min_set_point"]) / 10
-            self._attr_max_temp = float(smartHomeDevice["max_set_point"]) / 10
-        else:
-            self._attr_min_temp = float(446 / 10)
-            self._attr_max_temp = float(446 / 10)
-
-        if smartHomeDevice["heating_up"] == "0":
-            if smartHomeDevice["gv_mode"] == "1":
-                self._attr_hvac_action = HVACAction.OFF
-            else:
-                self._attr_hvac_action = HVACAction.IDLE
-        elif smartHomeDevice["heat_cool"] == "1":
-            self._attr_hvac_action = HVACAction.COOLING
-        else:
-            self._attr_hvac_action = HVACAction.HEATING
-
-        self._attr_preset_mode = _DEVICE_TO_MODE_TYPE[smartHomeDevice["gv_mode"]].heat_mode.value
-
-        if smartHomeDevice["gv_mode"] == "1":
-            self._attr_hvac_mode = HVACMode.OFF
-            self._attr_target_temperature = None
-            targettemp = 0
-        else:
-            if smartHomeDevice["heat_cool"] == "1":
-                self._attr_hvac_mode = HVACMode.COOL
-            else:
-                self._attr_hvac_mode = HVACMode.HEAT
-            consigne = _TEMP_TYPE_TO_DEVICE[_DEVICE_TO_MODE_TYPE[smartHomeDevice["gv_mode"]].temp_type]
-            self._attr_target_temperature = float(smartHomeDevice[consigne]) / 10
-            targettemp = self._attr_target_temperature
+        smartHomeDevice = self._get_device(self.smartHome, self.id)
+        if smartHomeDevice is None:
+            return
+
+        self._attr_current_temperature = smartHomeDevice.temperature_air
+        self._attr_min_temp = smartHomeDevice.min_temp
+        self._attr_max_temp = smartHomeDevice.max_temp
+        self._attr_hvac_action = smartHomeDevice.hvac_action
+        # A gv_mode the integration does not know has no preset
+        heat_mode = smartHomeDevice.heat_mode
+        self._attr_preset_mode = heat_mode.value if heat_mode is not None else None
+        self._attr_hvac_mode = smartHomeDevice.hvac_mode
+        self._attr_target_temperature = smartHomeDevice.target_temperature
+        targettemp = self._attr_target_temperature or 0
 
         logstring = f"Update: {self._name} targettemp={targettemp}"
         for consigne in [_TEMP_TYPE_TO_DEVICE[mode] for mode in _AVAILABLE_TEMP_TYPES]:
-            self._attr_extra_state_attributes[consigne] = (
-                float(smartHomeDevice[consigne]) / 10
+            self._attr_extra_state_attributes[consigne] = getattr(
+                smartHomeDevice, consigne
             )
             logstring += (
                 f" {consigne[9:]}={self._attr_extra_state_attributes[consigne]}"
             )
         _LOGGER.debug(logstring)
 
-        self._attr_extra_state_attributes["gv_mode"] = smartHomeDevice["gv_mode"]
+        self._attr_extra_state_attributes["gv_mode"] = smartHomeDevice.gv_mode
         _LOGGER.debug(
             "Update: {} air={} heat_mode {} temp_type {} min {} max {}".format(
                 self._name,
                 self._attr_current_temperature,
-                _DEVICE_TO_MODE_TYPE[smartHomeDevice["gv_mode"]].heat_mode,
-                _DEVICE_TO_MODE_TYPE[smartHomeDevice["gv_mode"]].temp_type,
+                smartHomeDevice.heat_mode,
+                smartHomeDevice.temp_type,
                 self._attr_min_temp,
                 self._attr_max_temp,
             )
@@ -192,6 +199,31 @@ class WattsThermostat(ClimateEntity):
         #     self._available = False
         #     _LOGGER.exception("Error retrieving data.")
 
+    def _set_device(self, **changes) -> None:
+        """
+        Show the commanded state right away, polls are masked until confirmed.
+
+        The changes have to be the fields the push sets, as commandChanges
+        returns them, or no poll ever confirms the command.
+        """
+        self.client.applyCommand(self.smartHome, self.id, changes)
+        # The sensors and groups of this thermostat follow as well
+        self.coordinator.async_update_device((self.smartHome, self.id))
+
+    async def _async_push(self, value: str, gvMode: str) -> bool:
+        """Push a command, dropping its optimistic state when it fails."""
+        self.coordinator.async_note_command()
+        try:
+            pushed = await self.client.queueTemperature(
+                self.smartHome, self.deviceID, value, gvMode
+            )
+        except Exception:
+            self.client.discardCommand(self.smartHome, self.id)
+            raise
+        if not pushed:
+            self.client.discardCommand(self.smartHome, self.id)
+        return pushed
+
     async def async_set_hvac_mode(self, hvac_mode):
         """Set new target hvac mode."""
         mode = self._attr_extra_state_attributes["previous_gv_mode"]
@@ -220,14 +252,9 @@ class WattsThermostat(ClimateEntity):
         value = str(value * 10)
 
         # reloading the devices may take some time, meanwhile set the new values manually
-        smartHomeDevice = self.client.getDevice(self.smartHome, self.id)
-        smartHomeDevice["consigne_manuel"] = value
-        smartHomeDevice["gv_mode"] = mode
+        self._set_device(**self.client.commandChanges(value, mode))
 
-        func = functools.partial(
-            self.client.pushTemperature, self.smartHome, self.deviceID, value, mode
-        )
-        await self.hass.async_add_executor_job(func)
+        return await self._async_push(value, mode)
 
     async def async_set_preset_mode(self, preset_mode):
         """Set new target preset mode."""
@@ -251,23 +278,12 @@ class WattsThermostat(ClimateEntity):
             self._attr_extra_state_attributes["previous_gv_mode"] = (
                 self._attr_extra_state_attributes["gv_mode"]
             )
-            _LOGGER.debug(
-                f"Set preset mode to {preset_mode} for device {self._name} "
-            )
+            _LOGGER.debug(f"Set preset mode to {preset_mode} for device {self._name} ")
 
         # reloading the devices may take some time, meanwhile set the new values manually
-        smartHomeDevice = self.client.getDevice(self.smartHome, self.id)
-        smartHomeDevice["consigne_manuel"] = value
-        smartHomeDevice["gv_mode"] = gv_mode
-
-        func = functools.partial(
-            self.client.pushTemperature,
-            self.smartHome,
-            self.deviceID,
-            value,
-            gv_mode,
-        )
-        await self.hass.async_add_executor_job(func)
+        self._set_device(**self.client.commandChanges(value, gv_mode))
+
+        return await self._async_push(value, gv_mode)
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperature."""
@@ -275,15 +291,21 @@ class WattsThermostat(ClimateEntity):
 
         # Get the smartHomeDevice
         smartHomeDevice = self.client.getDevice(self.smartHome, self.id)
+        if smartHomeDevice is None:
+            raise HomeAssistantError(f"Thermostat {self._name} is not available")
 
-        gvMode = smartHomeDevice["gv_mode"]
-        if _DEVICE_TO_MODE_TYPE[gvMode].heat_mode == HeatMode.PROGRAM:
+        gvMode = smartHomeDevice.gv_mode
+        if smartHomeDevice.heat_mode == HeatMode.PROGRAM:
             # This is not accepted by Watts!
             raise HomeAssistantError(
-                f"Setting temperature is not supported in {_DEVICE_TO_MODE_TYPE[gvMode].heat_mode.value} mode."
+                f"Setting temperature is not supported in {smartHomeDevice.heat_mode.value} mode."
             )
 
-        temp_type = _DEVICE_TO_MODE_TYPE[gvMode].temp_type
+        temp_type = smartHomeDevice.temp_type
+        if temp_type not in _TEMP_TYPE_TO_DEVICE:
+            raise HomeAssistantError(
+                f"Setting temperature is not supported in gv_mode {gvMode}."
+            )
 
         _LOGGER.debug(
             f"Set a-temperature to {value} for device {self._name} in temp_type {temp_type} - min {self._attr_min_temp} max {self._attr_max_temp}"
@@ -295,15 +317,168 @@ class WattsThermostat(ClimateEntity):
             f"Set b-temperature to {value} for device {self._name} in mode {temp_type}"
         )
 
-        # update its temp settings
-        smartHomeDevice["consigne_manuel"] = value
-        smartHomeDevice[_TEMP_TYPE_TO_DEVICE[_DEVICE_TO_MODE_TYPE[gvMode].temp_type]] = value
+        # update its temp settings, exactly as the push will set them
+        self._set_device(**self.client.commandChanges(value, str(gvMode)))
+
+        return await self._async_push(value, str(gvMode))
 
-        # Set the smartHomeDevice using the just altered SmartHomeDevice
-        # self.client.setDevice(self.smartHome, self.id, smartHomeDevice)
 
-        func = functools.partial(
-            self.client.pushTemperature, self.smartHome, self.deviceID, value, str(gvMode)
+class WattsThermostatGroup(WattsVisionEntity, ClimateEntity):
+    """All thermostats of a smart home, or of one of its zones, as one entity."""
+
+    def __init__(
+        self,
+        coordinator: WattsVisionCoordinator,
+        smartHome: dict,
+        members: list[WattsThermostat],
+        zone: str | None = None,
+    ):
+        super().__init__(
+            coordinator,
+            frozenset((smartHome["smarthome_id"], member.id) for member in members),
         )
+        self.smartHome = smartHome["smarthome_id"]
+        self._label = smartHome["label"]
+        self._mac_address = smartHome["mac_address"]
+        self.zone = zone
+        self.members = members
+        if zone is None:
+            self._name = "All zones " + self._label
+            self._unique_id = "watts_thermostat_group_" + self.smartHome
+        else:
+            self._name = zone + " Thermostats"
+            self._unique_id = "watts_thermostat_group_" + self.smartHome + "_" + zone
+
+    @property
+    def unique_id(self):
+        """Return the unique ID for this group."""
+        return self._unique_id
 
-        await self.hass.async_add_executor_job(func)
+    @property
+    def name(self) -> str:
+        """Return the name of the entity."""
+        return self._name
+
+    @property
+    def extra_state_attributes(self):
+        return {"entity_id": [member.entity_id for member in self.members]}
+
+    @property
+    def supported_features(self):
+        return (
+            ClimateEntityFeature.TARGET_TEMPERATURE | ClimateEntityFeature.PRESET_MODE
+        )
+
+    @property
+    def temperature_unit(self) -> str:
+        return UnitOfTemperature.FAHRENHEIT
+
+    @property
+    def hvac_modes(self) -> list[str]:
+        return [HVACMode.HEAT] + [HVACMode.COOL] + [HVACMode.OFF]
+
+    @property
+    def preset_modes(self) -> list[str]:
+        """Return the available presets."""
+        return [mode.value for mode in _AVAILABLE_HEAT_MODES]
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {
+                # Serial numbers are unique identifiers within a specific domain
+                (DOMAIN, self.smartHome)
+            },
+            "manufacturer": "Watts",
+            "name": "Central Unit " + self._label,
+            "model": "BT-CT02-RF",
+            "connections": {("mac", self._mac_address)},
+        }
+
+    @callback
+    def _update_state(self):
+        smartHomeDevices = [
+            smartHomeDevice
+            for member in self.members
+            if (smartHomeDevice := self.client.getDevice(self.smartHome, member.id))
+            is not None
+        ]
+        # Unavailable once all its members are gone from the account
+        self._attr_available = bool(smartHomeDevices)
+        if not smartHomeDevices:
+            return
+
+        self._attr_current_temperature = round(
+            sum(device.temperature_air for device in smartHomeDevices)
+            / len(smartHomeDevices),
+            1,
+        )
+        targets = [
+            device.target_temperature
+            for device in smartHomeDevices
+            if device.target_temperature is not None
+        ]
+        self._attr_target_temperature = (
+            round(sum(targets) / len(targets), 1) if targets else None
+        )
+        self._attr_min_temp = max(device.min_temp for device in smartHomeDevices)
+        self._attr_max_temp = max(
+            self._attr_min_temp, min(device.max_temp for device in smartHomeDevices)
+        )
+
+        # A mode is only reported when all members agree on it
+        presets = {
+            device.heat_mode.value if device.heat_mode is not None else None
+            for device in smartHomeDevices
+        }
+        self._attr_preset_mode = presets.pop() if len(presets) == 1 else None
+        modes = {device.hvac_mode for device in smartHomeDevices}
+        if len(modes) == 1:
+            self._attr_hvac_mode = modes.pop()
+        else:
+            self._attr_hvac_mode = (
+                HVACMode.COOL if HVACMode.COOL in modes else HVACMode.HEAT
+            )
+        actions = {device.hvac_action for device in smartHomeDevices}
+        for action in (HVACAction.HEATING, HVACAction.COOLING, HVACAction.IDLE):
+            if action in actions:
+                self._attr_hvac_action = action
+                break
+        else:
+            self._attr_hvac_action = HVACAction.OFF
+
+    async def _async_fan_out(self, command: str, commands) -> None:
+        """Send a command to all members at once and report failed members."""
+        results = await asyncio.gather(*commands, return_exceptions=True)
+        failed = [
+            member.name
+            for member, result in zip(self.members, results, strict=True)
+            if isinstance(result, Exception) or result is False
+        ]
+        self._update_state()
+        self.async_write_ha_state()
+        if failed:
+            raise HomeAssistantError(
+                f"{command} failed for {len(failed)} of {len(self.members)} thermostats: {', '.join(failed)}"
+            )
+
+    async def async_set_hvac_mode(self, hvac_mode):
+        """Set new target hvac mode on all members."""
+        await self._async_fan_out(
+            "Set hvac mode",
+            [member.async_set_hvac_mode(hvac_mode) for member in self.members],
+        )
+
+    async def async_set_preset_mode(self, preset_mode):
+        """Set new target preset mode on all members."""
+        await self._async_fan_out(
+            "Set preset mode",
+            [member.async_set_preset_mode(preset_mode) for member in self.members],
+        )
+
+    async def async_set_temperature(self, **kwargs):
+        """Set new target temperature on all members."""
+        await self._async_fan_out(
+            "Set temperature",
+            [member.async_set_temperature(**kwargs) for member in self.members],
+        )
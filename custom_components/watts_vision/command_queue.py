@@ -0,0 +1,73 @@
+"""Coalescing command queue for the Watts Vision thermostats."""
+
+import asyncio
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CommandQueue:
+    """
+    Coalesces the temperature commands of a single device.
+
+    Commands arriving within the window of the first one are merged into one
+    push that carries only the last requested state. Every caller gets the
+    result of that push. Pushes for a device are sent one at a time so they
+    reach the cloud in the order they were requested.
+    """
+
+    def __init__(self, hass: HomeAssistant, push, window: float):
+        self._hass = hass
+        self._push = push
+        self._window = window
+        self._pending = None
+        self._waiters: list[asyncio.Future] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._send_lock = asyncio.Lock()
+
+    async def async_push(self, value: str, gvMode: str) -> bool:
+        """Queue a command and wait for the push that carries it."""
+        if self._pending is not None:
+            _LOGGER.debug(f"Coalescing command {self._pending} into {value} {gvMode}")
+        self._pending = (value, gvMode)
+        waiter = self._hass.loop.create_future()
+        self._waiters.append(waiter)
+        if self._timer is None:
+            self._timer = self._hass.loop.call_later(self._window, self._flush)
+        return await waiter
+
+    @callback
+    def _flush(self) -> None:
+        """Send the pending command at the end of the window."""
+        self._timer = None
+        self._hass.async_create_background_task(
+            self._async_send(), "watts_vision command push"
+        )
+
+    async def async_flush(self) -> None:
+        """Send the pending command right away."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self._async_send()
+
+    async def _async_send(self) -> None:
+        async with self._send_lock:
+            if self._pending is None:
+                return
+            (value, gvMode), waiters = self._pending, self._waiters
+            self._pending, self._waiters = None, []
+
+            try:
+                result = await self._push(value, gvMode)
+            except Exception as exception:  # pylint: disable=broad-except
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(exception)
+                return
+
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(result)
@@ -6,7 +6,26 @@ from homeassistant.const import CONF_PASSWORD, CONF_SCAN_INTERVAL, CONF_USERNAME
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import DOMAIN, LOGGER
+from .const import (
+    CONF_COMMAND_DEBOUNCE,
+    CONF_LAST_COMMUNICATION_TTL,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_RATE_BURST,
+    CONF_RATE_LIMIT,
+    CONF_ZONE_GROUPS,
+    DEFAULT_COMMAND_DEBOUNCE,
+    DEFAULT_LAST_COMMUNICATION_TTL,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_RATE_BURST,
+    DEFAULT_RATE_LIMIT,
+    DOMAIN,
+    LOGGER,
+    PENDING_TOKENS,
+)
 from .watts_api import WattsApi
 
 # Schema for registering an account with the WattsVision API
@@ -82,9 +101,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         api = WattsApi(self.hass, user_input[CONF_USERNAME], user_input[CONF_PASSWORD])
 
         try:
-            authenticated = await self.hass.async_add_executor_job(
-                api.test_authentication
-            )
+            authenticated = await api.test_authentication()
+            api.cancelTokenRenewal()
         # pylint: disable=broad-except
         except Exception as exception:
             LOGGER.exception(
@@ -101,6 +119,11 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if authenticated is False:
             self.errors = {CONF_USERNAME: "invalid_credentials"}
             return False
+
+        # Hand the session over to the first setup of the entry
+        self.hass.data.setdefault(DOMAIN, {}).setdefault(PENDING_TOKENS, {})[
+            user_input[CONF_USERNAME]
+        ] = api.exportTokens()
         return True
 
     async def async_step_settings(self, user_input: dict | None = None) -> FlowResult:
@@ -131,6 +154,11 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             )
 
             self.input.update(user_input)
+            # Backing off must never poll faster than the regular refresh
+            self.input.setdefault(
+                CONF_MAX_SCAN_INTERVAL,
+                max(DEFAULT_MAX_SCAN_INTERVAL, self.input[CONF_SCAN_INTERVAL]),
+            )
 
             LOGGER.info(
                 "[ConfigFlow] [async_step_settings] Creating entry %s", self.input
@@ -161,6 +189,12 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input[CONF_SCAN_INTERVAL] > 86400:
             self.errors = {CONF_SCAN_INTERVAL: "scan_interval_too_high"}
             return False
+        if CONF_MAX_SCAN_INTERVAL in user_input and (
+            user_input[CONF_MAX_SCAN_INTERVAL] < user_input[CONF_SCAN_INTERVAL]
+            or user_input[CONF_MAX_SCAN_INTERVAL] > 86400
+        ):
+            self.errors = {CONF_MAX_SCAN_INTERVAL: "max_scan_interval_invalid"}
+            return False
         return True
 
     @staticmethod
@@ -214,9 +248,23 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             updated = self.hass.config_entries.async_update_entry(
                 self.config_entry,
                 data={
+                    # Keeps settings without a field, such as the cloud URLs
+                    **self.config_entry.data,
                     CONF_USERNAME: self.config_entry.data[CONF_USERNAME],
                     CONF_PASSWORD: self.config_entry.data[CONF_PASSWORD],
                     CONF_SCAN_INTERVAL: user_input[CONF_SCAN_INTERVAL],
+                    CONF_ZONE_GROUPS: user_input.get(CONF_ZONE_GROUPS, False),
+                    CONF_MIN_SCAN_INTERVAL: user_input[CONF_MIN_SCAN_INTERVAL],
+                    CONF_MAX_SCAN_INTERVAL: user_input[CONF_MAX_SCAN_INTERVAL],
+                    CONF_LAST_COMMUNICATION_TTL: user_input[
+                        CONF_LAST_COMMUNICATION_TTL
+                    ],
+                    CONF_RATE_LIMIT: user_input[CONF_RATE_LIMIT],
+                    CONF_RATE_BURST: user_input[CONF_RATE_BURST],
+                    CONF_MAX_CONCURRENT_REQUESTS: user_input[
+                        CONF_MAX_CONCURRENT_REQUESTS
+                    ],
+                    CONF_COMMAND_DEBOUNCE: user_input[CONF_COMMAND_DEBOUNCE],
                 },
             )
             if updated:
@@ -244,7 +292,55 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 {
                     vol.Optional(
                         CONF_SCAN_INTERVAL, description={"suggested_value": interval}
-                    ): int
+                    ): int,
+                    vol.Optional(
+                        CONF_ZONE_GROUPS,
+                        default=self.config_entry.data.get(CONF_ZONE_GROUPS, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_MIN_SCAN_INTERVAL,
+                        default=self.config_entry.data.get(
+                            CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL
+                        ),
+                    ): int,
+                    vol.Optional(
+                        CONF_MAX_SCAN_INTERVAL,
+                        default=self.config_entry.data.get(
+                            CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+                        ),
+                    ): int,
+                    vol.Optional(
+                        CONF_LAST_COMMUNICATION_TTL,
+                        default=self.config_entry.data.get(
+                            CONF_LAST_COMMUNICATION_TTL,
+                            DEFAULT_LAST_COMMUNICATION_TTL,
+                        ),
+                    ): int,
+                    vol.Optional(
+                        CONF_RATE_LIMIT,
+                        default=self.config_entry.data.get(
+                            CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT
+                        ),
+                    ): int,
+                    vol.Optional(
+                        CONF_RATE_BURST,
+                        default=self.config_entry.data.get(
+                            CONF_RATE_BURST, DEFAULT_RATE_BURST
+                        ),
+                    ): int,
+                    vol.Optional(
+                        CONF_MAX_CONCURRENT_REQUESTS,
+                        default=self.config_entry.data.get(
+                            CONF_MAX_CONCURRENT_REQUESTS,
+                            DEFAULT_MAX_CONCURRENT_REQUESTS,
+                        ),
+                    ): int,
+                    vol.Optional(
+                        CONF_COMMAND_DEBOUNCE,
+                        default=self.config_entry.data.get(
+                            CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE
+                        ),
+                    ): float,
                 }
             ),
             errors=self.errors,
@@ -270,4 +366,44 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         if user_input[CONF_SCAN_INTERVAL] > 86400:
             self.errors = {CONF_SCAN_INTERVAL: "scan_interval_too_high"}
             return False
+        if (
+            user_input[CONF_MIN_SCAN_INTERVAL] < 30
+            or user_input[CONF_MIN_SCAN_INTERVAL] > user_input[CONF_SCAN_INTERVAL]
+        ):
+            self.errors = {CONF_MIN_SCAN_INTERVAL: "min_scan_interval_invalid"}
+            return False
+        if (
+            user_input[CONF_MAX_SCAN_INTERVAL] < user_input[CONF_SCAN_INTERVAL]
+            or user_input[CONF_MAX_SCAN_INTERVAL] > 86400
+        ):
+            self.errors = {CONF_MAX_SCAN_INTERVAL: "max_scan_interval_invalid"}
+            return False
+        if (
+            user_input[CONF_LAST_COMMUNICATION_TTL] < 60
+            or user_input[CONF_LAST_COMMUNICATION_TTL] > 86400
+        ):
+            self.errors = {
+                CONF_LAST_COMMUNICATION_TTL: "last_communication_ttl_invalid"
+            }
+            return False
+        if user_input[CONF_RATE_LIMIT] < 1 or user_input[CONF_RATE_LIMIT] > 600:
+            self.errors = {CONF_RATE_LIMIT: "rate_limit_invalid"}
+            return False
+        if user_input[CONF_RATE_BURST] < 1 or user_input[CONF_RATE_BURST] > 100:
+            self.errors = {CONF_RATE_BURST: "rate_burst_invalid"}
+            return False
+        if (
+            user_input[CONF_MAX_CONCURRENT_REQUESTS] < 1
+            or user_input[CONF_MAX_CONCURRENT_REQUESTS] > 20
+        ):
+            self.errors = {
+                CONF_MAX_CONCURRENT_REQUESTS: "max_concurrent_requests_invalid"
+            }
+            return False
+        if (
+            user_input[CONF_COMMAND_DEBOUNCE] < 0
+            or user_input[CONF_COMMAND_DEBOUNCE] > 10
+        ):
+            self.errors = {CONF_COMMAND_DEBOUNCE: "command_debounce_invalid"}
+            return False
         return True
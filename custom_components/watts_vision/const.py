@@ -17,8 +17,92 @@ from homeassistant.components.climate.const import (
 
 API_CLIENT = "api"
 
+COORDINATOR = "coordinator"
+
+# Storage of the tokens of a config entry
+TOKEN_STORE = "token_store"
+
+# Storage of the device snapshot of a config entry
+SNAPSHOT_STORE = "snapshot_store"
+
+# Rate limiter shared by the clients of all accounts
+RATE_LIMITER = "rate_limiter"
+# entry_id -> rate and burst of the accounts using it
+RATE_LIMITER_USERS = "rate_limiter_users"
+
+# Option to add a group climate entity per zone label
+CONF_ZONE_GROUPS = "zone_groups"
+
+# Bounds of the adaptive refresh interval, in seconds
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+DEFAULT_MIN_SCAN_INTERVAL = 30
+DEFAULT_MAX_SCAN_INTERVAL = 1800
+
+# Seconds a central unit's last communication check is reused by the refreshes
+CONF_LAST_COMMUNICATION_TTL = "last_communication_ttl"
+DEFAULT_LAST_COMMUNICATION_TTL = 600
+
+# Seconds the optimistic state of a command masks polls that do not report it
+PENDING_COMMAND_TIMEOUT = 120
+
+# Seconds to keep polling at the minimum interval after a command
+COMMAND_POLL_WINDOW = 120
+
+# Unchanged refreshes without any heating before the interval backs off
+IDLE_CYCLES_BEFORE_BACKOFF = 3
+MAX_BACKOFF_EXPONENT = 10
+
+# Tokens obtained by the config flow, keyed by username, for the first setup
+PENDING_TOKENS = "pending_tokens"
+
+STORAGE_VERSION = 1
+TOKEN_STORAGE_KEY = "watts_vision.tokens"
+# Devices of the last refresh, entities start from them on the next setup
+SNAPSHOT_STORAGE_KEY = "watts_vision.snapshot"
+
+# Maximum number of concurrent smarthome/read requests during a refresh
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+
+# Seconds before expiry at which tokens are renewed in the background
+DEFAULT_TOKEN_RENEW_MARGIN = 60
+# Base and cap in seconds of the backoff between failed background renewals
+TOKEN_RENEW_RETRY_BASE = 30
+TOKEN_RENEW_RETRY_MAX = 900
+
+# Seconds during which commands for the same device are merged into one push
+CONF_COMMAND_DEBOUNCE = "command_debounce"
+DEFAULT_COMMAND_DEBOUNCE = 1.0
+
+# Retries of a request failing with a 5xx, 429 or connection error, and the
+# base and cap in seconds of the jittered exponential backoff between them
+DEFAULT_MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 1.0
+RETRY_BACKOFF_MAX = 30.0
+
+# Sustained requests per minute to the cloud and the burst allowed on top,
+# shared by all requests of an account. The burst is sized for a whole-home
+# group command, which pushes to every thermostat at once: up to 40 of them
+# go out together instead of one per second.
+CONF_RATE_LIMIT = "rate_limit"
+CONF_RATE_BURST = "rate_burst"
+DEFAULT_RATE_LIMIT = 60
+DEFAULT_RATE_BURST = 40
+
+# Failed requests in a row before the circuit opens, and seconds until a probe
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60
+
 DOMAIN = "watts_vision"
 
+# Base URLs of the Watts cloud, entries may point elsewhere, e.g. at a
+# stand-in cloud for benchmarks, through these keys of their data
+CONF_AUTH_URL = "auth_url"
+CONF_API_URL = "api_url"
+DEFAULT_AUTH_URL = "https://auth.smarthome.wattselectronics.com"
+DEFAULT_API_URL = "https://smarthome.wattselectronics.com/api/v0.1/human"
+
 LOGGER = logging.getLogger(__package__)
 
 PRESET_DEFROST = "Frost Protection"
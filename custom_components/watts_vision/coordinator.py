@@ -0,0 +1,245 @@
+"""Watts Vision data update coordinator."""
+
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import (
+    COMMAND_POLL_WINDOW,
+    DOMAIN,
+    IDLE_CYCLES_BEFORE_BACKOFF,
+    MAX_BACKOFF_EXPONENT,
+)
+from .exceptions import WattsApiError
+from .watts_api import WattsApi
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WattsVisionCoordinator(DataUpdateCoordinator):
+    """Owns the refresh cycle of a Watts Vision account."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        client: WattsApi,
+        update_interval: timedelta,
+        min_interval: timedelta,
+        max_interval: timedelta,
+        last_communication_ttl: timedelta,
+        stagger: timedelta = timedelta(0),
+    ):
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=entry,
+            name=DOMAIN,
+            update_interval=update_interval,
+        )
+        self.client = client
+        self._base_interval = update_interval
+        self._min_interval = min_interval
+        # Backing off must never poll faster than the regular refresh
+        self._max_interval = max(max_interval, update_interval)
+        self._last_communication_ttl = last_communication_ttl.total_seconds()
+        # Poll at the minimum interval until this monotonic time
+        self._command_poll_until = 0.0
+        self._idle_cycles = 0
+        self._failures = 0
+        self._snapshot = None
+        self._snapshot_version = None
+        # Devices that changed in the last refresh, None to update all listeners
+        self._changed = None
+        self._skipped_writes = 0
+        self._total_skipped_writes = 0
+        # Phase of the regular refreshes, keeping the accounts out of step
+        # however their refreshes drift or back off
+        self._stagger = stagger
+        # Read the smart homes again instead of only their devices
+        self._reload_homes = False
+        # Smart homes and devices the platforms were set up with
+        self._layout = self._read_layout()
+
+    @callback
+    def async_reload_homes(self) -> None:
+        """Read the smart homes of the account again on the next refresh."""
+        self._reload_homes = True
+
+    @callback
+    def async_note_command(self) -> None:
+        """Poll quickly for a while so the result of a command shows up soon."""
+        self._command_poll_until = time.monotonic() + COMMAND_POLL_WINDOW
+        if self.update_interval != self._min_interval:
+            self.update_interval = self._min_interval
+            _LOGGER.debug("Command sent, polling every %s", self.update_interval)
+            self._schedule_refresh()
+
+    async def _async_update_data(self):
+        """Reload the devices of all smart homes."""
+        start = time.monotonic()
+        self.client.metrics.start_refresh()
+        error = None
+        try:
+            return await self._async_refresh_devices()
+        except Exception as exception:
+            error = str(exception)
+            raise
+        finally:
+            self.client.metrics.record_refresh(time.monotonic() - start, error)
+
+    async def _async_refresh_devices(self):
+        _LOGGER.debug("Refreshing devices")
+        try:
+            if self._reload_homes:
+                loaded = await self.client.loadData()
+                self._reload_homes = not loaded
+            else:
+                loaded = await self.client.reloadDevices()
+        except WattsApiError as exception:
+            loaded = False
+            error = str(exception)
+        else:
+            error = "Could not load any smart home"
+        if not loaded:
+            self._failures += 1
+            self.update_interval = self._next_interval()
+            raise UpdateFailed(f"{error}, retrying in {self.update_interval}")
+        self._failures = 0
+
+        previous = self._snapshot
+        if self.client.index_version == self._snapshot_version:
+            # No home sent new data, so no device can have changed
+            snapshot, changed = previous, set()
+        else:
+            # Devices are immutable, a shallow copy is a snapshot
+            snapshot = dict(self.client.getDevices())
+            changed = {
+                key
+                for key, device in snapshot.items()
+                if previous is None or previous.get(key) != device
+            }
+            if previous is not None:
+                changed.update(previous.keys() - snapshot.keys())
+            self._snapshot_version = self.client.index_version
+        self.client.metrics.record_diff(len(changed))
+        heating = any(device.heating_up for device in snapshot.values())
+        if heating or changed:
+            self._idle_cycles = 0
+        else:
+            self._idle_cycles += 1
+        self._snapshot = snapshot
+
+        # Entities that showed an optimistic state must take the polled one
+        changed.update(self.client.popChangedDevices())
+        # (smarthome_id, None) stands for the central unit of a smart home
+        changed.update(
+            (smarthome, None)
+            for smarthome in await self.client.refreshLastCommunication(
+                self._last_communication_ttl
+            )
+        )
+        # After a failed refresh every entity has to become available again
+        self._changed = (
+            changed if previous is not None and self.last_update_success else None
+        )
+
+        self.update_interval = self._next_interval()
+        _LOGGER.debug("Next refresh in %s", self.update_interval)
+
+        # The platforms only create entities when the entry is set up
+        layout = self._read_layout()
+        if not layout <= self._layout:
+            _LOGGER.info("New smart homes or devices found, reloading the entry")
+            self._layout = layout
+            self.hass.config_entries.async_schedule_reload(self.config_entry.entry_id)
+        return self.client.getSmartHomes()
+
+    def _read_layout(self) -> set:
+        """Return the keys of the smart homes and devices of the account."""
+        # (smarthome_id, None) stands for a smart home, as for the central units
+        return {
+            (smartHome["smarthome_id"], None)
+            for smartHome in self.client.getSmartHomes() or ()
+        } | self.client.getDevices().keys()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners of the devices that changed in the last refresh."""
+        changed, self._changed = self._changed, None
+        listeners = list(self._listeners.values())
+        if changed is not None:
+            listeners = [
+                (update_callback, context)
+                for update_callback, context in listeners
+                if context is None or self._listens_to(context, changed)
+            ]
+        self._skipped_writes = len(self._listeners) - len(listeners)
+        self._total_skipped_writes += self._skipped_writes
+        self.client.metrics.record_fan_out(len(listeners))
+        if self._skipped_writes:
+            _LOGGER.debug("Skipped %s unchanged entities", self._skipped_writes)
+        for update_callback, _ in listeners:
+            self._async_call_listener(update_callback)
+
+    @callback
+    def async_update_device(self, key: tuple) -> None:
+        """Update the listeners of a device whose cached state was replaced."""
+        changed = {key}
+        for update_callback, context in list(self._listeners.values()):
+            if context is not None and self._listens_to(context, changed):
+                self._async_call_listener(update_callback)
+
+    @callback
+    def _async_call_listener(self, update_callback) -> None:
+        """Update one listener, an entity that fails must not starve the others."""
+        try:
+            update_callback()
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Error updating a Watts Vision entity")
+
+    @staticmethod
+    def _listens_to(context, changed: set) -> bool:
+        """Return whether a listener context names one of the changed devices."""
+        # The context is a device key or a set of them, as for thermostat groups
+        if isinstance(context, tuple):
+            return context in changed
+        return not changed.isdisjoint(context)
+
+    @property
+    def skipped_writes(self) -> int:
+        """Number of entities left alone in the last refresh."""
+        return self._skipped_writes
+
+    @property
+    def total_skipped_writes(self) -> int:
+        """Number of entity updates skipped since the integration started."""
+        return self._total_skipped_writes
+
+    def _next_interval(self) -> timedelta:
+        """Pick the interval until the next refresh."""
+        if self._failures:
+            # Back off exponentially while the API keeps failing
+            backoff = 2 ** min(self._failures, MAX_BACKOFF_EXPONENT)
+            return min(self._base_interval * backoff, self._max_interval)
+        if time.monotonic() < self._command_poll_until:
+            return self._min_interval
+        if self._idle_cycles >= IDLE_CYCLES_BEFORE_BACKOFF:
+            # Nothing is heating and nothing changed for a while
+            exponent = self._idle_cycles - IDLE_CYCLES_BEFORE_BACKOFF + 1
+            backoff = 2 ** min(exponent, MAX_BACKOFF_EXPONENT)
+            return self._align(min(self._base_interval * backoff, self._max_interval))
+        return self._align(self._base_interval)
+
+    def _align(self, interval: timedelta) -> timedelta:
+        """Move the next refresh onto the staggered schedule of the account."""
+        period = interval.total_seconds()
+        delay = period - (time.monotonic() - self._stagger.total_seconds()) % period
+        # Never refresh much sooner than the interval asks for
+        if delay < period / 2:
+            delay += period
+        return timedelta(seconds=delay)
@@ -0,0 +1,122 @@
+"""Typed state of a Watts Vision thermostat."""
+
+from dataclasses import dataclass, field, fields
+
+from homeassistant.components.climate import HVACAction, HVACMode
+
+from .const import _DEVICE_TO_MODE_TYPE, _TEMP_TYPE_TO_DEVICE, HeatMode, TempType
+
+# Frost protection holds a fixed setpoint, in tenths of a degree
+_FROST_SET_POINT = 446 / 10
+
+
+@dataclass(frozen=True, slots=True)
+class WattsDevice:
+    """
+    State of a thermostat as of the last refresh.
+
+    Built once per refresh from the smarthome/read record. Temperatures are
+    converted from the tenths of a degree the API reports, and the heat mode,
+    temperature type and hvac state are resolved up front so entities only
+    read attributes. Setpoint fields keep the API names so they can be looked
+    up through _TEMP_TYPE_TO_DEVICE.
+    """
+
+    id: str
+    id_device: str
+    gv_mode: str
+    heating_up: bool
+    cooling: bool
+    error_code: int
+    time_boost: int
+    temperature_air: float
+    min_set_point: float
+    max_set_point: float
+    consigne_confort: float
+    consigne_eco: float
+    consigne_hg: float
+    consigne_boost: float
+    consigne_manuel: float
+    # Derived from the fields above
+    heat_mode: HeatMode | None = field(init=False)
+    temp_type: TempType | None = field(init=False)
+    min_temp: float = field(init=False)
+    max_temp: float = field(init=False)
+    target_temperature: float | None = field(init=False)
+    hvac_mode: HVACMode = field(init=False)
+    hvac_action: HVACAction = field(init=False)
+
+    def __post_init__(self) -> None:
+        mode = _DEVICE_TO_MODE_TYPE.get(self.gv_mode)
+        heat_mode = mode.heat_mode if mode is not None else None
+        temp_type = mode.temp_type if mode is not None else None
+
+        if self.gv_mode == "2":
+            min_temp = max_temp = _FROST_SET_POINT
+        else:
+            min_temp, max_temp = self.min_set_point, self.max_set_point
+
+        if self.gv_mode == "1" or temp_type not in _TEMP_TYPE_TO_DEVICE:
+            target_temperature = None
+        else:
+            target_temperature = self.setpoint(temp_type)
+
+        if self.gv_mode == "1":
+            hvac_mode = HVACMode.OFF
+        elif self.cooling:
+            hvac_mode = HVACMode.COOL
+        else:
+            hvac_mode = HVACMode.HEAT
+
+        if not self.heating_up:
+            hvac_action = HVACAction.OFF if self.gv_mode == "1" else HVACAction.IDLE
+        elif self.cooling:
+            hvac_action = HVACAction.COOLING
+        else:
+            hvac_action = HVACAction.HEATING
+
+        # Frozen, so the derived fields are set around __setattr__
+        set_field = object.__setattr__
+        set_field(self, "heat_mode", heat_mode)
+        set_field(self, "temp_type", temp_type)
+        set_field(self, "min_temp", min_temp)
+        set_field(self, "max_temp", max_temp)
+        set_field(self, "target_temperature", target_temperature)
+        set_field(self, "hvac_mode", hvac_mode)
+        set_field(self, "hvac_action", hvac_action)
+
+    @classmethod
+    def from_api(cls, device: dict) -> "WattsDevice":
+        """Decode a device record of the smarthome/read endpoint."""
+        return cls(
+            id=device["id"],
+            id_device=device["id_device"],
+            gv_mode=device["gv_mode"],
+            heating_up=device["heating_up"] != "0",
+            cooling=device["heat_cool"] == "1",
+            error_code=int(device["error_code"]),
+            time_boost=int(device["time_boost"]),
+            temperature_air=float(device["temperature_air"]) / 10,
+            min_set_point=float(device["min_set_point"]) / 10,
+            max_set_point=float(device["max_set_point"]) / 10,
+            consigne_confort=float(device["consigne_confort"]) / 10,
+            consigne_eco=float(device["consigne_eco"]) / 10,
+            consigne_hg=float(device["consigne_hg"]) / 10,
+            consigne_boost=float(device["consigne_boost"]) / 10,
+            consigne_manuel=float(device["consigne_manuel"]) / 10,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WattsDevice":
+        """Restore a device exported by as_dict."""
+        return cls(**data)
+
+    def as_dict(self) -> dict:
+        """Export the API fields, the derived ones are computed again on restore."""
+        return {
+            item.name: getattr(self, item.name) for item in fields(self) if item.init
+        }
+
+    def setpoint(self, temp_type: TempType) -> float:
+        """Return the temperature of a temperature type."""
+        return getattr(self, _TEMP_TYPE_TO_DEVICE[temp_type])
@@ -0,0 +1,77 @@
+"""Diagnostics support for Watts Vision."""
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import COORDINATOR, DOMAIN
+from .coordinator import WattsVisionCoordinator
+
+# The entry title is the username of the account
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, "title", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: WattsVisionCoordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+    client = coordinator.client
+    metrics = client.metrics
+
+    smartHomes = client.getSmartHomes() or []
+    zones = [zone for smartHome in smartHomes for zone in smartHome.get("zones") or ()]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "snapshot": {
+            "homes": len(smartHomes),
+            "zones": len(zones),
+            "devices": len(client.getDevices()),
+            "bytes": client.snapshot_bytes,
+            "unchanged_reads": client.unchanged_reads,
+        },
+        "token": client.getTokenState(),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": (
+                None
+                if coordinator.update_interval is None
+                else coordinator.update_interval.total_seconds()
+            ),
+            "skipped_writes": coordinator.total_skipped_writes,
+        },
+        "circuit": {
+            "state": client.circuit_state.value,
+            "trips": client.circuit_trips,
+            "retries": client.retries,
+        },
+        "rate_limit": client.getRateLimitState(),
+        "commands": {
+            "latencies": client.command_latencies,
+            "expired": client.expired_commands,
+        },
+        "endpoints": {
+            name: {
+                "requests": endpoint.requests,
+                "errors": dict(endpoint.errors),
+                "bytes_received": endpoint.bytes_received,
+                "latency_mean_ms": (
+                    None
+                    if endpoint.latency.mean is None
+                    else round(endpoint.latency.mean * 1000, 1)
+                ),
+                "latency": endpoint.latency.as_dict(),
+                "queue_delay_mean_ms": (
+                    None
+                    if endpoint.queue_delay.mean is None
+                    else round(endpoint.queue_delay.mean * 1000, 1)
+                ),
+            }
+            for name, endpoint in metrics.endpoints.items()
+        },
+        "refreshes": [refresh.as_dict() for refresh in metrics.refreshes],
+    }
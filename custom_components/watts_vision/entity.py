@@ -0,0 +1,41 @@
+"""Base entity for the Watts Vision integration."""
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import WattsVisionCoordinator
+from .device import WattsDevice
+
+
+class WattsVisionEntity(CoordinatorEntity[WattsVisionCoordinator]):
+    """Entity that is updated once per refresh of the coordinator."""
+
+    def __init__(self, coordinator: WattsVisionCoordinator, context=None):
+        super().__init__(coordinator, context)
+        self.client = coordinator.client
+
+    @property
+    def available(self) -> bool:
+        """Unavailable while the refreshes fail or the device is gone."""
+        return super().available and self._attr_available
+
+    def _get_device(self, smartHome: str, deviceId: str) -> WattsDevice | None:
+        """Return a device, the entity is unavailable while it is gone."""
+        device = self.client.getDevice(smartHome, deviceId)
+        self._attr_available = device is not None
+        return device
+
+    async def async_added_to_hass(self) -> None:
+        """Take the current data as initial state."""
+        await super().async_added_to_hass()
+        self._update_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update the state from the freshly loaded data."""
+        self._update_state()
+        self.async_write_ha_state()
+
+    @callback
+    def _update_state(self) -> None:
+        """Update the entity attributes from the client data."""
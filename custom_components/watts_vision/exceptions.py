@@ -0,0 +1,19 @@
+"""Exceptions raised by the Watts Vision API client."""
+
+from homeassistant.exceptions import HomeAssistantError
+
+
+class WattsApiError(HomeAssistantError):
+    """Base class for Watts Vision API errors."""
+
+
+class WattsConnectionError(WattsApiError):
+    """The Watts Vision cloud could not be reached, even after retrying."""
+
+
+class WattsDecodeError(WattsApiError):
+    """A response was OK but held records that could not be decoded."""
+
+
+class CircuitOpenError(WattsApiError):
+    """The circuit is open, the request was not sent."""
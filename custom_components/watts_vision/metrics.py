@@ -0,0 +1,199 @@
+"""Request and refresh metrics of the Watts Vision integration."""
+
+import bisect
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+# Upper bounds in seconds of the latency histogram buckets, the last is open
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Refresh cycles kept for the diagnostics
+REFRESH_HISTORY = 20
+
+ENDPOINTS = (
+    "token",
+    "user/read",
+    "smarthome/read",
+    "query/push",
+    "check_last_connexion",
+)
+
+
+class Histogram:
+    """Counts of observations per bucket, with their sum."""
+
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add an observation."""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    @property
+    def mean(self) -> float | None:
+        """Mean of the observations, None before the first one."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the bucket counts keyed by their upper bound."""
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ["le_inf"]
+        return dict(zip(labels, self.counts, strict=True))
+
+
+@dataclass(slots=True)
+class EndpointMetrics:
+    """Metrics of the requests to one endpoint, counting every attempt."""
+
+    requests: int = 0
+    # "status 503", "key ERR_..." or an exception name -> count
+    errors: dict[str, int] = field(default_factory=dict)
+    latency: Histogram = field(default_factory=Histogram)
+    # Seconds spent waiting for the rate limiter
+    queue_delay: Histogram = field(default_factory=Histogram)
+    bytes_received: int = 0
+
+    @property
+    def error_count(self) -> int:
+        """Number of failed requests."""
+        return sum(self.errors.values())
+
+    def record(
+        self, latency: float, size: int, error: str | None = None, queued: float = 0.0
+    ) -> None:
+        """Record a request attempt."""
+        self.requests += 1
+        self.latency.observe(latency)
+        self.queue_delay.observe(queued)
+        self.bytes_received += size
+        if error is not None:
+            self.record_error(error)
+
+    def record_error(self, error: str) -> None:
+        """Record an error of a request, by status, API key or exception."""
+        self.errors[error] = self.errors.get(error, 0) + 1
+
+
+@dataclass(slots=True)
+class RequestTrace:
+    """A request made during a refresh cycle, with all its attempts."""
+
+    endpoint: str
+    duration: float
+    attempts: int
+    # None when no response was received
+    status: int | None
+    size: int
+    error: str | None = None
+    # Seconds of the duration spent waiting for the rate limiter
+    queued: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the request as diagnostics data."""
+        return {
+            "endpoint": self.endpoint,
+            "duration_ms": round(self.duration * 1000, 1),
+            "queued_ms": round(self.queued * 1000, 1),
+            "retries": self.attempts - 1,
+            "status": self.status,
+            "bytes": self.size,
+            "error": self.error,
+        }
+
+
+@dataclass(slots=True)
+class RefreshTrace:
+    """Timeline of a refresh cycle."""
+
+    started: datetime
+    duration: float | None = None
+    requests: list[RequestTrace] = field(default_factory=list)
+    # Devices that differ from the previous snapshot, None if not compared
+    changed_devices: int | None = None
+    # Entities the refresh updated, set after the listeners ran
+    fan_out: int | None = None
+    error: str | None = None
+
+    @property
+    def retries(self) -> int:
+        """Number of retried attempts of the requests of this refresh."""
+        return sum(request.attempts - 1 for request in self.requests)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the refresh as diagnostics data."""
+        return {
+            "started": self.started.isoformat(),
+            "duration_ms": (
+                None if self.duration is None else round(self.duration * 1000, 1)
+            ),
+            "retries": self.retries,
+            "changed_devices": self.changed_devices,
+            "fan_out": self.fan_out,
+            "error": self.error,
+            "requests": [request.as_dict() for request in self.requests],
+        }
+
+
+@dataclass(slots=True)
+class MetricsRegistry:
+    """All metrics of a Watts Vision account."""
+
+    endpoints: dict[str, EndpointMetrics] = field(
+        default_factory=lambda: {endpoint: EndpointMetrics() for endpoint in ENDPOINTS}
+    )
+    refresh_duration: Histogram = field(default_factory=Histogram)
+    last_refresh_duration: float | None = None
+    # Entities notified by the last refresh, and in total
+    last_fan_out: int = 0
+    total_fan_out: int = 0
+    # The last refresh cycles, the running one is also kept as current
+    refreshes: deque[RefreshTrace] = field(
+        default_factory=lambda: deque(maxlen=REFRESH_HISTORY)
+    )
+    current: RefreshTrace | None = None
+
+    def endpoint(self, name: str) -> EndpointMetrics:
+        """Return the metrics of an endpoint."""
+        return self.endpoints.setdefault(name, EndpointMetrics())
+
+    def start_refresh(self) -> RefreshTrace:
+        """Start the timeline of a refresh cycle."""
+        self.current = RefreshTrace(dt_util.utcnow())
+        self.refreshes.append(self.current)
+        return self.current
+
+    def record_request(self, request: RequestTrace) -> None:
+        """Add a request to the timeline of the running refresh, if any."""
+        if self.current is not None:
+            self.current.requests.append(request)
+
+    def record_diff(self, devices: int) -> None:
+        """Record the number of devices the running refresh found changed."""
+        if self.current is not None:
+            self.current.changed_devices = devices
+
+    def record_refresh(self, duration: float, error: str | None = None) -> None:
+        """Record the duration of a refresh cycle and end its timeline."""
+        self.last_refresh_duration = duration
+        self.refresh_duration.observe(duration)
+        if self.current is not None:
+            self.current.duration = duration
+            self.current.error = error
+            self.current = None
+
+    def record_fan_out(self, entities: int) -> None:
+        """Record the number of entities a refresh updated."""
+        self.last_fan_out = entities
+        self.total_fan_out += entities
+        if self.refreshes and self.refreshes[-1].fan_out is None:
+            self.refreshes[-1].fan_out = entities
@@ -0,0 +1,74 @@
+"""Pending thermostat commands of the Watts Vision integration."""
+
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+
+from .device import WattsDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class PendingCommand:
+    """Fields a command set on a device, waiting for a poll to report them."""
+
+    changes: dict
+    sent_at: float
+    deadline: float
+
+
+class PendingCommands:
+    """
+    Tracks the commands the cloud has not confirmed yet, per device.
+
+    Polls can return data from before a push. Until a poll reports every
+    field of a command, or its deadline passes, those fields are taken
+    from the command instead of the poll so the optimistic state does not
+    snap back. The time from the command to its confirmation is recorded.
+    """
+
+    def __init__(self, timeout: float, history: int = 50):
+        self._timeout = timeout
+        self._pending: dict[tuple, PendingCommand] = {}
+        self.latencies: deque[float] = deque(maxlen=history)
+        self.expired = 0
+
+    def add(self, key: tuple, changes: dict) -> None:
+        """Record a command, replacing the one still pending for the device."""
+        # Commands are coalesced and only the last one is pushed, so only its
+        # fields will ever be reported by a poll
+        now = time.monotonic()
+        self._pending[key] = PendingCommand(dict(changes), now, now + self._timeout)
+
+    def discard(self, key: tuple) -> None:
+        """Forget the command of a device, for instance when its push failed."""
+        self._pending.pop(key, None)
+
+    def has_pending(self, smarthome: str) -> bool:
+        """Return whether a device of a smart home has a pending command."""
+        return any(key[0] == smarthome for key in self._pending)
+
+    def reconcile(self, key: tuple, device: WattsDevice) -> WattsDevice:
+        """Return the polled device with the fields of a pending command."""
+        pending = self._pending.get(key)
+        if pending is None:
+            return device
+
+        now = time.monotonic()
+        if all(
+            getattr(device, field) == value for field, value in pending.changes.items()
+        ):
+            del self._pending[key]
+            self.latencies.append(now - pending.sent_at)
+            _LOGGER.debug(
+                f"Command for {key} confirmed in {now - pending.sent_at:.1f}s"
+            )
+            return device
+        if now >= pending.deadline:
+            del self._pending[key]
+            self.expired += 1
+            _LOGGER.debug(f"Command for {key} was not confirmed in time")
+            return device
+        return replace(device, **pending.changes)
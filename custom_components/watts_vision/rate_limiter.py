@@ -0,0 +1,109 @@
+"""Token bucket limiting the request rate to the Watts Vision cloud."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Order in which waiting requests get a token, lowest first."""
+
+    COMMAND = 0
+    READ = 1
+
+
+class RateLimiter:
+    """
+    Shares a sustained request rate and a burst among all requests.
+
+    The bucket holds up to ``burst`` tokens and refills at ``rate`` tokens per
+    second, every request takes one. Requests that find the bucket empty
+    wait in line, commands ahead of the reads that were already waiting so a
+    thermostat change is never stuck behind a refresh of a large account.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        # (priority, arrival, future) of the requests waiting for a token
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._throttled = 0
+
+    @property
+    def rate(self) -> float:
+        """Sustained requests per second."""
+        return self._rate
+
+    @property
+    def burst(self) -> int:
+        """Requests that may be sent at once after a quiet period."""
+        return self._burst
+
+    @property
+    def waiting(self) -> int:
+        """Number of requests waiting for a token."""
+        return sum(not future.done() for _, _, future in self._waiters)
+
+    @property
+    def throttled(self) -> int:
+        """Number of requests that had to wait for a token."""
+        return self._throttled
+
+    def configure(self, rate: float, burst: int) -> None:
+        """Change the sustained rate and the burst, keeping the tokens left."""
+        self._refill()
+        self._rate = rate
+        self._burst = burst
+        self._tokens = min(self._tokens, burst)
+        # The wake-up was computed for the old rate
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._schedule()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    async def acquire(self, priority: Priority = Priority.READ) -> float:
+        """Wait for a token, returns the seconds spent waiting."""
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), future))
+        self._throttled += 1
+        self._schedule()
+        await future
+        return time.monotonic() - start
+
+    def _schedule(self) -> None:
+        """Wake up when the next token is available."""
+        if self._timer is None:
+            delay = max(0.0, (1 - self._tokens) / self._rate)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._release)
+
+    def _release(self) -> None:
+        """Hand the available tokens to the waiting requests in order."""
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            # Cancelled requests leave their place in line without a token
+            if not future.done():
+                self._tokens -= 1
+                future.set_result(None)
+        if self._waiters:
+            self._schedule()
@@ -2,111 +2,133 @@
 
 import logging
 from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import timedelta
+from typing import Any
 
-from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import PERCENTAGE, UnitOfTemperature
-from homeassistant.core import HomeAssistant
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTemperature,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
 
 from .central_unit import WattsVisionLastCommunicationSensor
+from .circuit_breaker import CircuitState
 from .const import (
-    API_CLIENT,
+    COORDINATOR,
     DOMAIN,
     _AVAILABLE_HEAT_MODES,
     _AVAILABLE_TEMP_TYPES,
-    _DEVICE_TO_MODE_TYPE,
-    _TEMP_TYPE_TO_DEVICE,
 )
-from .watts_api import WattsApi
+from .coordinator import WattsVisionCoordinator
+from .entity import WattsVisionEntity
+from .metrics import ENDPOINTS, MetricsRegistry
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(seconds=120)
-
 
 async def async_setup_entry(
     hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: Callable
 ):
     """Set up the sensor platform."""
-    wattsClient: WattsApi = hass.data[DOMAIN][API_CLIENT]
+    coordinator: WattsVisionCoordinator = hass.data[DOMAIN][config_entry.entry_id][
+        COORDINATOR
+    ]
 
-    smartHomes = wattsClient.getSmartHomes()
+    smartHomes = coordinator.client.getSmartHomes()
 
     sensors = []
 
     if smartHomes is not None:
         for y in range(len(smartHomes)):
-            if smartHomes[y]["zones"] is not None:
+            if smartHomes[y].get("zones") is not None:
                 for z in range(len(smartHomes[y]["zones"])):
                     if smartHomes[y]["zones"][z]["devices"] is not None:
                         for x in range(len(smartHomes[y]["zones"][z]["devices"])):
                             sensors.append(
                                 WattsVisionPresetModeSensor(
-                                    wattsClient,
+                                    coordinator,
                                     smartHomes[y]["smarthome_id"],
-                                    smartHomes[y]["zones"][z]["devices"][x]["id"],
+                                    smartHomes[y]["zones"][z]["devices"][x].id,
                                     smartHomes[y]["zones"][z]["zone_label"],
                                 )
                             )
                             sensors.append(
                                 WattsVisionTemperatureModeSensor(
-                                    wattsClient,
+                                    coordinator,
                                     smartHomes[y]["smarthome_id"],
-                                    smartHomes[y]["zones"][z]["devices"][x]["id"],
+                                    smartHomes[y]["zones"][z]["devices"][x].id,
                                     smartHomes[y]["zones"][z]["zone_label"],
                                 )
                             )
                             sensors.append(
                                 WattsVisionTemperatureSensor(
-                                    wattsClient,
+                                    coordinator,
                                     smartHomes[y]["smarthome_id"],
-                                    smartHomes[y]["zones"][z]["devices"][x]["id"],
+                                    smartHomes[y]["zones"][z]["devices"][x].id,
                                     smartHomes[y]["zones"][z]["zone_label"],
                                 )
                             )
                             sensors.append(
                                 WattsVisionSetTemperatureSensor(
-                                    wattsClient,
+                                    coordinator,
                                     smartHomes[y]["smarthome_id"],
-                                    smartHomes[y]["zones"][z]["devices"][x]["id"],
+                                    smartHomes[y]["zones"][z]["devices"][x].id,
                                     smartHomes[y]["zones"][z]["zone_label"],
                                 )
                             )
                             sensors.append(
                                 WattsVisionBatterySensor(
-                                    wattsClient,
+                                    coordinator,
                                     smartHomes[y]["smarthome_id"],
-                                    smartHomes[y]["zones"][z]["devices"][x]["id"],
+                                    smartHomes[y]["zones"][z]["devices"][x].id,
                                     smartHomes[y]["zones"][z]["zone_label"],
                                 )
                             )
                             sensors.append(
                                 WattsVisionBoostTimeRemainingSensor(
-                                    wattsClient,
+                                    coordinator,
                                     smartHomes[y]["smarthome_id"],
-                                    smartHomes[y]["zones"][z]["devices"][x]["id"],
+                                    smartHomes[y]["zones"][z]["devices"][x].id,
                                     smartHomes[y]["zones"][z]["zone_label"],
                                 )
                             )
             sensors.append(
                 WattsVisionLastCommunicationSensor(
-                    wattsClient,
+                    coordinator,
                     smartHomes[y]["smarthome_id"],
                     smartHomes[y]["label"],
                     smartHomes[y]["mac_address"],
                 )
             )
 
-    async_add_entities(sensors, update_before_add=True)
+    sensors.append(WattsVisionCircuitSensor(coordinator, config_entry.entry_id))
+    sensors.append(WattsVisionSkippedWritesSensor(coordinator, config_entry.entry_id))
+    sensors.extend(
+        WattsVisionMetricSensor(coordinator, config_entry.entry_id, description)
+        for description in METRIC_SENSORS
+    )
 
+    async_add_entities(sensors)
 
-class WattsVisionPresetModeSensor(SensorEntity):
+
+class WattsVisionPresetModeSensor(WattsVisionEntity, SensorEntity):
     """Representation of a Watts Vision thermostat."""
 
-    def __init__(self, wattsClient: WattsApi, smartHome: str, id: str, zone: str):
-        super().__init__()
-        self.client = wattsClient
+    def __init__(
+        self, coordinator: WattsVisionCoordinator, smartHome: str, id: str, zone: str
+    ):
+        super().__init__(coordinator, (smartHome, id))
         self.smartHome = smartHome
         self.id = id
         self.zone = zone
@@ -150,22 +172,28 @@ class WattsVisionPresetModeSensor(SensorEntity):
             "suggested_area": self.zone,
         }
 
-    async def async_update(self):
+    @callback
+    def _update_state(self):
         # try:
-        smartHomeDevice = self.client.getDevice(self.smartHome, self.id)
+        smartHomeDevice = self._get_device(self.smartHome, self.id)
+        if smartHomeDevice is None:
+            return
 
-        self._state = _DEVICE_TO_MODE_TYPE[smartHomeDevice["gv_mode"]].heat_mode.value.capitalize()
+        # A gv_mode the integration does not know has no preset
+        heat_mode = smartHomeDevice.heat_mode
+        self._state = heat_mode.value.capitalize() if heat_mode is not None else None
 
         # except:
         #     self._available = False
         #     _LOGGER.exception("Error retrieving data.")
 
-class WattsVisionTemperatureModeSensor(SensorEntity):
+class WattsVisionTemperatureModeSensor(WattsVisionEntity, SensorEntity):
     """Representation of a Watts Vision thermostat."""
 
-    def __init__(self, wattsClient: WattsApi, smartHome: str, id: str, zone: str):
-        super().__init__()
-        self.client = wattsClient
+    def __init__(
+        self, coordinator: WattsVisionCoordinator, smartHome: str, id: str, zone: str
+    ):
+        super().__init__(coordinator, (smartHome, id))
         self.smartHome = smartHome
         self.id = id
         self.zone = zone
@@ -209,22 +237,27 @@ class WattsVisionTemperatureModeSensor(SensorEntity):
             "suggested_area": self.zone,
         }
 
-    async def async_update(self):
+    @callback
+    def _update_state(self):
         # try:
-        smartHomeDevice = self.client.getDevice(self.smartHome, self.id)
+        smartHomeDevice = self._get_device(self.smartHome, self.id)
+        if smartHomeDevice is None:
+            return
 
-        self._state = _DEVICE_TO_MODE_TYPE[smartHomeDevice["gv_mode"]].temp_type.value.capitalize()
+        temp_type = smartHomeDevice.temp_type
+        self._state = temp_type.value.capitalize() if temp_type is not None else None
 
         # except:
         #     self._available = False
         #     _LOGGER.exception("Error retrieving data.")
 
-class WattsVisionBatterySensor(SensorEntity):
+class WattsVisionBatterySensor(WattsVisionEntity, SensorEntity):
     """Representation of the state of a Watts Vision device."""
 
-    def __init__(self, wattsClient: WattsApi, smartHome: str, id: str, zone: str):
-        super().__init__()
-        self.client = wattsClient
+    def __init__(
+        self, coordinator: WattsVisionCoordinator, smartHome: str, id: str, zone: str
+    ):
+        super().__init__(coordinator, (smartHome, id))
         self.smartHome = smartHome
         self.id = id
         self.zone = zone
@@ -251,13 +284,8 @@ class WattsVisionBatterySensor(SensorEntity):
         return PERCENTAGE
 
     @property
-    def state(self) -> int:
-        if self.client.getDevice(self.smartHome, self.id)["error_code"] == 1:
-            _LOGGER.warning(
-                "Battery is malfunctioning or (almost) empty for device %s ", self.id
-            )
-            return 0
-        return 100
+    def state(self) -> int | None:
+        return self._state
 
     @property
     def device_info(self):
@@ -272,13 +300,27 @@ class WattsVisionBatterySensor(SensorEntity):
             "via_device": (DOMAIN, self.smartHome),
         }
 
+    @callback
+    def _update_state(self):
+        smartHomeDevice = self._get_device(self.smartHome, self.id)
+        if smartHomeDevice is None:
+            return
+        if smartHomeDevice.error_code == 1:
+            _LOGGER.warning(
+                "Battery is malfunctioning or (almost) empty for device %s ", self.id
+            )
+            self._state = 0
+        else:
+            self._state = 100
+
 
-class WattsVisionTemperatureSensor(SensorEntity):
+class WattsVisionTemperatureSensor(WattsVisionEntity, SensorEntity):
     """Representation of a Watts Vision temperature sensor."""
 
-    def __init__(self, wattsClient: WattsApi, smartHome: str, id: str, zone: str):
-        super().__init__()
-        self.client = wattsClient
+    def __init__(
+        self, coordinator: WattsVisionCoordinator, smartHome: str, id: str, zone: str
+    ):
+        super().__init__(coordinator, (smartHome, id))
         self.smartHome = smartHome
         self.id = id
         self.zone = zone
@@ -321,25 +363,29 @@ class WattsVisionTemperatureSensor(SensorEntity):
             "via_device": (DOMAIN, self.smartHome),
         }
 
-    async def async_update(self):
+    @callback
+    def _update_state(self):
         # try:
-        smartHomeDevice = self.client.getDevice(self.smartHome, self.id)
-        value = int(smartHomeDevice["temperature_air"])
+        smartHomeDevice = self._get_device(self.smartHome, self.id)
+        if smartHomeDevice is None:
+            return
+        value = smartHomeDevice.temperature_air
         if self.hass.config.units.temperature_unit == UnitOfTemperature.CELSIUS:
-            self._state = round((value - 320) * 5 / 9 / 10, 1)
+            self._state = round((value - 32) * 5 / 9, 1)
         else:
-            self._state = value / 10
+            self._state = value
         # except:
         #     self._available = False
         #     _LOGGER.exception("Error retrieving data.")
 
 
-class WattsVisionSetTemperatureSensor(SensorEntity):
+class WattsVisionSetTemperatureSensor(WattsVisionEntity, SensorEntity):
     """Representation of a Watts Vision temperature sensor."""
 
-    def __init__(self, wattsClient: WattsApi, smartHome: str, id: str, zone: str):
-        super().__init__()
-        self.client = wattsClient
+    def __init__(
+        self, coordinator: WattsVisionCoordinator, smartHome: str, id: str, zone: str
+    ):
+        super().__init__(coordinator, (smartHome, id))
         self.smartHome = smartHome
         self.id = id
         self.zone = zone
@@ -382,27 +428,30 @@ class WattsVisionSetTemperatureSensor(SensorEntity):
             "via_device": (DOMAIN, self.smartHome),
         }
 
-    async def async_update(self):
+    @callback
+    def _update_state(self):
         # try:
-        smartHomeDevice = self.client.getDevice(self.smartHome, self.id)
-
-        if smartHomeDevice["gv_mode"] == "1":
-            self._state = NaN
+        smartHomeDevice = self._get_device(self.smartHome, self.id)
+        if smartHomeDevice is None:
+            return
+
+        value = smartHomeDevice.target_temperature
+        if value is None:
+            self._state = None
+        elif self.hass.config.units.temperature_unit == UnitOfTemperature.CELSIUS:
+            self._state = round((value - 32) * 5 / 9, 1)
         else:
-            value = int(smartHomeDevice[_TEMP_TYPE_TO_DEVICE[_DEVICE_TO_MODE_TYPE[smartHomeDevice["gv_mode"]].temp_type]])
-            if self.hass.config.units.temperature_unit == UnitOfTemperature.CELSIUS:
-                self._state = round((value - 320) * 5 / 9 / 10, 1)
-            else:
-                self._state = value / 10
+            self._state = value
 
         # except:
         #     self._available = False
         #     _LOGGER.exception("Error retrieving data.")
 
-class WattsVisionBoostTimeRemainingSensor(SensorEntity):
-    def __init__(self, wattsClient: WattsApi, smartHome: str, id: str, zone: str):
-        super().__init__()
-        self.client = wattsClient
+class WattsVisionBoostTimeRemainingSensor(WattsVisionEntity, SensorEntity):
+    def __init__(
+        self, coordinator: WattsVisionCoordinator, smartHome: str, id: str, zone: str
+    ):
+        super().__init__(coordinator, (smartHome, id))
         self.smartHome_id = smartHome
         self.device_id = id
         self.zone_label = zone
@@ -450,11 +499,13 @@ class WattsVisionBoostTimeRemainingSensor(SensorEntity):
         }
 
 
-    async def async_update(self):
+    @callback
+    def _update_state(self):
         # try:
-        smartHomeDevice = self.client.getDevice(self.smartHome_id, self.device_id)
-        value = int(smartHomeDevice["time_boost"])
-        remaining = timedelta(seconds=value)
+        smartHomeDevice = self._get_device(self.smartHome_id, self.device_id)
+        if smartHomeDevice is None:
+            return
+        remaining = timedelta(seconds=smartHomeDevice.time_boost)
 
         # Sensor state: HH:MM:SS
         self._attr_native_value = str(remaining)
@@ -473,4 +524,183 @@ class WattsVisionBoostTimeRemainingSensor(SensorEntity):
 
         # except:
         #     self._available = False
-        #     _LOGGER.exception("Error retrieving data.")
\ No newline at end of file
+        #     _LOGGER.exception("Error retrieving data.")
+
+
+class WattsVisionCircuitSensor(WattsVisionEntity, SensorEntity):
+    """State of the circuit breaker in front of the Watts Vision cloud."""
+
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_options = [state.value for state in CircuitState]
+
+    def __init__(self, coordinator: WattsVisionCoordinator, entry_id: str):
+        super().__init__(coordinator)
+        self._attr_unique_id = "circuit_" + entry_id
+        self._attr_name = "Watts Vision cloud circuit"
+
+    @property
+    def available(self) -> bool:
+        """Stay available while the refreshes fail, that is what it reports."""
+        return True
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the circuit, the coordinator is quiet while refreshes keep failing."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.client.addCircuitListener(self._handle_coordinator_update)
+        )
+
+    @callback
+    def _update_state(self):
+        self._attr_native_value = self.client.circuit_state.value
+        self._attr_extra_state_attributes = {
+            "trips": self.client.circuit_trips,
+            "retries": self.client.retries,
+        }
+
+
+class WattsVisionSkippedWritesSensor(WattsVisionEntity, SensorEntity):
+    """Entity updates saved because their device did not change."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, coordinator: WattsVisionCoordinator, entry_id: str):
+        super().__init__(coordinator)
+        self._attr_unique_id = "skipped_writes_" + entry_id
+        self._attr_name = "Watts Vision skipped state writes"
+
+    @callback
+    def _update_state(self):
+        self._attr_native_value = self.coordinator.total_skipped_writes
+        self._attr_extra_state_attributes = {
+            "last_refresh": self.coordinator.skipped_writes,
+        }
+
+
+@dataclass(frozen=True, kw_only=True)
+class WattsVisionMetricSensorDescription(SensorEntityDescription):
+    """Describes a metric of the requests or refreshes."""
+
+    value_fn: Callable[[MetricsRegistry], Any]
+    attrs_fn: Callable[[MetricsRegistry], dict[str, Any]] | None = None
+
+
+def _endpoint_metric_sensors(
+    endpoint: str,
+) -> tuple[WattsVisionMetricSensorDescription, ...]:
+    return (
+        WattsVisionMetricSensorDescription(
+            key=f"{endpoint}_requests",
+            name=f"Watts Vision {endpoint} requests",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            value_fn=lambda metrics: metrics.endpoint(endpoint).requests,
+        ),
+        WattsVisionMetricSensorDescription(
+            key=f"{endpoint}_errors",
+            name=f"Watts Vision {endpoint} errors",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            value_fn=lambda metrics: metrics.endpoint(endpoint).error_count,
+            attrs_fn=lambda metrics: dict(metrics.endpoint(endpoint).errors),
+        ),
+        WattsVisionMetricSensorDescription(
+            key=f"{endpoint}_latency",
+            name=f"Watts Vision {endpoint} latency",
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+            suggested_display_precision=0,
+            value_fn=lambda metrics: _milliseconds(
+                metrics.endpoint(endpoint).latency.mean
+            ),
+            attrs_fn=lambda metrics: metrics.endpoint(endpoint).latency.as_dict(),
+        ),
+        WattsVisionMetricSensorDescription(
+            key=f"{endpoint}_queue_delay",
+            name=f"Watts Vision {endpoint} queue delay",
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+            suggested_display_precision=0,
+            value_fn=lambda metrics: _milliseconds(
+                metrics.endpoint(endpoint).queue_delay.mean
+            ),
+            attrs_fn=lambda metrics: metrics.endpoint(endpoint).queue_delay.as_dict(),
+        ),
+        WattsVisionMetricSensorDescription(
+            key=f"{endpoint}_bytes_received",
+            name=f"Watts Vision {endpoint} bytes received",
+            device_class=SensorDeviceClass.DATA_SIZE,
+            native_unit_of_measurement=UnitOfInformation.BYTES,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            value_fn=lambda metrics: metrics.endpoint(endpoint).bytes_received,
+        ),
+    )
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    return None if seconds is None else seconds * 1000
+
+
+METRIC_SENSORS: tuple[WattsVisionMetricSensorDescription, ...] = (
+    *(
+        description
+        for endpoint in ENDPOINTS
+        for description in _endpoint_metric_sensors(endpoint)
+    ),
+    WattsVisionMetricSensorDescription(
+        key="refresh_duration",
+        name="Watts Vision refresh duration",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=0,
+        value_fn=lambda metrics: _milliseconds(metrics.last_refresh_duration),
+        attrs_fn=lambda metrics: {
+            "mean": _milliseconds(metrics.refresh_duration.mean),
+            "count": metrics.refresh_duration.count,
+            **metrics.refresh_duration.as_dict(),
+        },
+    ),
+    WattsVisionMetricSensorDescription(
+        key="fan_out",
+        name="Watts Vision refresh fan-out",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.last_fan_out,
+        attrs_fn=lambda metrics: {"total": metrics.total_fan_out},
+    ),
+)
+
+
+class WattsVisionMetricSensor(WattsVisionEntity, SensorEntity):
+    """A metric of the integration, disabled until someone needs it."""
+
+    entity_description: WattsVisionMetricSensorDescription
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator: WattsVisionCoordinator,
+        entry_id: str,
+        description: WattsVisionMetricSensorDescription,
+    ):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"metric_{description.key}_{entry_id}"
+
+    @property
+    def available(self) -> bool:
+        """Stay available while the refreshes fail, the metrics show why."""
+        return True
+
+    @callback
+    def _update_state(self):
+        metrics = self.client.metrics
+        self._attr_native_value = self.entity_description.value_fn(metrics)
+        if self.entity_description.attrs_fn is not None:
+            self._attr_extra_state_attributes = self.entity_description.attrs_fn(
+                metrics
+            )
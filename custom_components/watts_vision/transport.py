@@ -0,0 +1,200 @@
+"""Transports carrying the requests of the Watts Vision API client."""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from collections.abc import Mapping
+from datetime import UTC, datetime
+from typing import Any, NamedTuple, Protocol
+from urllib.parse import urlsplit
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+CASSETTE_VERSION = 1
+
+# Form fields and response keys that never end up in a cassette
+REDACTED = "**REDACTED**"
+REDACT_KEYS = {
+    "access_token",
+    "email",
+    "id_token",
+    "password",
+    "refresh_token",
+    "username",
+}
+
+
+class TransportResponse(NamedTuple):
+    """A response with its body read."""
+
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+
+
+class Transport(Protocol):
+    """Carries a form post to the Watts cloud and returns its response."""
+
+    async def post(
+        self, url: str, data: dict, headers: dict | None = None
+    ) -> TransportResponse:
+        """Post a form and read the whole response."""
+
+
+class HttpTransport:
+    """Posts forms to the Watts cloud on an aiohttp session."""
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self._session = session
+
+    async def post(
+        self, url: str, data: dict, headers: dict | None = None
+    ) -> TransportResponse:
+        """Post a form and read the whole response."""
+        async with self._session.post(
+            url=url, headers=headers, data=data, timeout=REQUEST_TIMEOUT
+        ) as response:
+            return TransportResponse(
+                response.status, response.headers, await response.read()
+            )
+
+
+def _redact(value: Any) -> Any:
+    """Return a copy of decoded JSON without credentials and tokens."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key in REDACT_KEYS else _redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+
+def _redact_body(body: bytes) -> str:
+    """Return a body as text, redacted if it is JSON holding secrets."""
+    text = body.decode(errors="replace")
+    try:
+        decoded = json.loads(text)
+    except ValueError:
+        return text
+    redacted = _redact(decoded)
+    # Keep the original bytes, and so the payload size, when nothing is secret
+    return text if redacted == decoded else json.dumps(redacted)
+
+
+class RecordingTransport:
+    """
+    Records the exchanges of another transport into a cassette.
+
+    Credentials and tokens are redacted from the forms and the bodies, the
+    Authorization header is not recorded at all. Call save from an executor
+    to write the cassette.
+    """
+
+    def __init__(self, transport: Transport):
+        self._transport = transport
+        self._started = time.monotonic()
+        self._exchanges: list[dict] = []
+
+    @property
+    def exchanges(self) -> int:
+        """Number of exchanges recorded."""
+        return len(self._exchanges)
+
+    async def post(
+        self, url: str, data: dict, headers: dict | None = None
+    ) -> TransportResponse:
+        """Post through the wrapped transport and record the exchange."""
+        exchange = {
+            "path": urlsplit(url).path,
+            "form": {
+                key: REDACTED if key in REDACT_KEYS else value
+                for key, value in data.items()
+            },
+            "offset": time.monotonic() - self._started,
+        }
+        start = time.monotonic()
+        try:
+            response = await self._transport.post(url, data, headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+            exchange["elapsed"] = time.monotonic() - start
+            exchange["error"] = type(exception).__name__
+            self._exchanges.append(exchange)
+            raise
+        exchange["elapsed"] = time.monotonic() - start
+        exchange["status"] = response.status
+        if "Retry-After" in response.headers:
+            exchange["retry_after"] = response.headers["Retry-After"]
+        exchange["body"] = _redact_body(response.body)
+        self._exchanges.append(exchange)
+        return response
+
+    def save(self, path: str) -> None:
+        """Write the cassette, this does blocking I/O."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": CASSETTE_VERSION,
+                    "recorded": datetime.now(UTC).isoformat(),
+                    "exchanges": self._exchanges,
+                },
+                file,
+                indent=1,
+            )
+        _LOGGER.debug("Recorded %s exchanges to %s", len(self._exchanges), path)
+
+
+class ReplayTransport:
+    """
+    Serves the exchanges of a cassette instead of calling the cloud.
+
+    Requests are matched on their path and smart home, each match serves the
+    next recorded exchange and the last one is served again once they run
+    out, so any number of refreshes can be replayed. Every response takes
+    its recorded time multiplied by time_scale, 0 answers at once.
+    """
+
+    def __init__(self, exchanges: list[dict], time_scale: float = 1.0):
+        self._time_scale = time_scale
+        self._exchanges: dict[tuple, deque[dict]] = {}
+        for exchange in exchanges:
+            self._exchanges.setdefault(self._key(exchange), deque()).append(exchange)
+
+    @classmethod
+    def load(cls, path: str, time_scale: float = 1.0) -> "ReplayTransport":
+        """Read a cassette, this does blocking I/O."""
+        with open(path, encoding="utf-8") as file:
+            cassette = json.load(file)
+        if cassette.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {cassette.get('version')}")
+        return cls(cassette["exchanges"], time_scale)
+
+    @staticmethod
+    def _key(exchange: dict) -> tuple:
+        return exchange["path"], exchange["form"].get("smarthome_id")
+
+    async def post(
+        self, url: str, data: dict, headers: dict | None = None
+    ) -> TransportResponse:
+        """Serve the next recorded exchange of the request."""
+        queue = self._exchanges.get((urlsplit(url).path, data.get("smarthome_id")))
+        if not queue:
+            _LOGGER.debug("No recorded exchange for %s", url)
+            return TransportResponse(404, {}, b"")
+        exchange = queue.popleft() if len(queue) > 1 else queue[0]
+
+        if self._time_scale:
+            await asyncio.sleep(exchange["elapsed"] * self._time_scale)
+        if "error" in exchange:
+            raise aiohttp.ClientConnectionError(f"Recorded {exchange['error']}")
+        headers = {}
+        if "retry_after" in exchange:
+            headers["Retry-After"] = exchange["retry_after"]
+        return TransportResponse(exchange["status"], headers, exchange["body"].encode())
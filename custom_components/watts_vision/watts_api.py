@@ -1,38 +1,289 @@
+import asyncio
+import functools
 import logging
+import random
 import time
+from collections.abc import Callable
+from dataclasses import replace
 from datetime import datetime, timedelta
+from typing import Any, NamedTuple
 
-import requests
-from homeassistant.core import HomeAssistant
+import aiohttp
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
+
+from .circuit_breaker import CircuitBreaker, CircuitState
+from .command_queue import CommandQueue
+from .const import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    DEFAULT_API_URL,
+    DEFAULT_AUTH_URL,
+    DEFAULT_COMMAND_DEBOUNCE,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RATE_BURST,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_TOKEN_RENEW_MARGIN,
+    PENDING_COMMAND_TIMEOUT,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    TOKEN_RENEW_RETRY_BASE,
+    TOKEN_RENEW_RETRY_MAX,
+)
+from .device import WattsDevice
+from .exceptions import WattsConnectionError, WattsDecodeError
+from .metrics import EndpointMetrics, MetricsRegistry, RequestTrace
+from .pending_commands import PendingCommands
+from .rate_limiter import Priority, RateLimiter
+from .transport import HttpTransport, Transport
 
 _LOGGER = logging.getLogger(__name__)
 
+# Responses worth retrying, any 5xx is retried as well
+RETRY_STATUSES = {429}
+
+
+class ApiResponse(NamedTuple):
+    """Decoded envelope of a Watts API response."""
+
+    code: str
+    key: str
+    value: str
+    data: Any
+
 
 class WattsApi:
     """Interface to the Watts API."""
 
-    def __init__(self, hass: HomeAssistant, username: str, password: str):
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        username: str,
+        password: str,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        token_renew_margin: int = DEFAULT_TOKEN_RENEW_MARGIN,
+        command_debounce: float = DEFAULT_COMMAND_DEBOUNCE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        auth_url: str = DEFAULT_AUTH_URL,
+        api_url: str = DEFAULT_API_URL,
+        transport: Transport | None = None,
+        rate_limit: float = DEFAULT_RATE_LIMIT,
+        rate_burst: int = DEFAULT_RATE_BURST,
+        rate_limiter: RateLimiter | None = None,
+    ):
         """Init dummy hub."""
         self._hass = hass
         self._username = username
         self._password = password
+        self._auth_url = auth_url.rstrip("/")
+        self._api_url = api_url.rstrip("/")
         self._token = None
         self._token_expires = None
         self._refresh_token = None
-        self._refreshing_token = False
+        self._token_lock = asyncio.Lock()
+        self._token_renew_margin = timedelta(seconds=token_renew_margin)
+        self._cancel_token_renewal = None
+        self._token_renewal_task = None
+        # Background renewals that failed in a row
+        self._token_renewal_failures = 0
+        # Number of times a request had to wait for a token refresh itself
+        self._inline_token_refreshes = 0
+        self._token_listener = None
+        self._snapshot_listener = None
+        self._command_debounce = command_debounce
+        # (smarthome_id, id_device) -> CommandQueue
+        self._commandQueues = {}
         self._refresh_expires_in = None
         self._smartHomeData = {}
+        # (smarthome_id, device id) -> device, (smarthome_id, zone_label) -> zone
+        self._deviceIndex = {}
+        self._deviceZoneIndex = {}
+        self._zoneIndex = {}
+        # Devices replaced through setDevice since the last popChangedDevices
+        self._changedDevices = set()
+        self._pendingCommands = PendingCommands(PENDING_COMMAND_TIMEOUT)
+        # smarthome_id -> hash of the last merged smarthome/read body
+        self._fingerprints = {}
+        self._unchangedReads = 0
+        # Bumped whenever the device index is rebuilt
+        self._indexVersion = 0
+        # smarthome_id -> last communication of its central unit, and the
+        # monotonic time of the check that produced it
+        self._lastCommunication = {}
+        self._lastCommunicationChecked = {}
+        # smarthome_id -> size in bytes of the last merged smarthome/read body
+        self._bodySizes = {}
+        # Home Assistant's shared session is keep-alive and pools connections per
+        # host, so consecutive calls reuse the TLS connection instead of doing a
+        # new handshake. aiohttp sends Accept-Encoding gzip and inflates for us.
+        self._transport = transport or HttpTransport(async_get_clientsession(hass))
+        # Caps the number of smarthome/read calls in flight during a reload
+        self._reload_semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self._max_retries = max_retries
+        # Number of requests retried after a transient failure
+        self._retries = 0
+        self._breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        self._metrics = MetricsRegistry()
+        # A limiter shared with other accounts replaces rate_limit and rate_burst
+        self._limiter = rate_limiter or RateLimiter(rate_limit / 60, rate_burst)
+
+    async def _request(
+        self,
+        endpoint: str,
+        url: str,
+        data: dict,
+        headers: dict | None = None,
+        priority: Priority = Priority.READ,
+    ) -> tuple[int, bytes]:
+        """
+        Post a form, retrying transient failures behind the circuit breaker.
+
+        Every attempt waits for a token of the rate limiter, in line by
+        priority. 5xx and 429 responses and connection errors are retried with
+        full jitter exponential backoff. Every attempt is recorded in the
+        metrics of the endpoint. Returns the status and the raw body, the body
+        is left to the caller to decode exactly once.
+
+        Raises:
+            CircuitOpenError: the circuit is open and the request was not sent
+            WattsConnectionError: the request still failed after all retries
+
+        """
+        metrics = self._metrics.endpoint(endpoint)
+        probe = self._breaker.allow()
+        started = time.monotonic()
+        status = None
+        queued = 0.0
+        try:
+            for attempt in range(self._max_retries + 1):
+                retry_after = None
+                delay = await self._limiter.acquire(priority)
+                queued += delay
+                start = time.monotonic()
+                try:
+                    response = await self._transport.post(url, data, headers)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+                    metrics.record(
+                        time.monotonic() - start, 0, type(exception).__name__, delay
+                    )
+                    error = f"{type(exception).__name__}: {exception}"
+                else:
+                    body = response.body
+                    metrics.record(
+                        time.monotonic() - start,
+                        len(body),
+                        None if response.status == 200 else f"status {response.status}",
+                        delay,
+                    )
+                    status = response.status
+                    if status < 500 and status not in RETRY_STATUSES:
+                        self._breaker.record_success()
+                        self._metrics.record_request(
+                            RequestTrace(
+                                endpoint,
+                                time.monotonic() - started,
+                                attempt + 1,
+                                status,
+                                len(body),
+                                queued=queued,
+                            )
+                        )
+                        return status, body
+                    error = f"status {status}"
+                    retry_after = response.headers.get("Retry-After")
+
+                if attempt == self._max_retries:
+                    break
+                delay = self._retry_delay(attempt, retry_after)
+                _LOGGER.debug(
+                    "Request to %s failed with %s, retry %s/%s in %.1f seconds",
+                    url,
+                    error,
+                    attempt + 1,
+                    self._max_retries,
+                    delay,
+                )
+                self._retries += 1
+                await asyncio.sleep(delay)
+
+            self._breaker.record_failure()
+            self._metrics.record_request(
+                RequestTrace(
+                    endpoint,
+                    time.monotonic() - started,
+                    attempt + 1,
+                    status,
+                    0,
+                    error,
+                    queued,
+                )
+            )
+            raise WattsConnectionError(
+                f"Request to {url} failed after {self._max_retries + 1} attempts: {error}"
+            )
+        finally:
+            # Whatever ended the probe, it must not keep the circuit half open
+            # for good, after a recorded result this changes nothing
+            if probe:
+                self._breaker.release()
+
+    @staticmethod
+    def _retry_delay(attempt: int, retry_after: str | None) -> float:
+        """Return the full jitter backoff delay, honouring a Retry-After header."""
+        delay = random.uniform(
+            0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2**attempt)
+        )
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), RETRY_BACKOFF_MAX))
+        return delay
+
+    @property
+    def circuit_state(self) -> CircuitState:
+        """State of the circuit breaker in front of the Watts cloud."""
+        return self._breaker.state
 
-    def test_authentication(self) -> bool:
+    def addCircuitListener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener when the circuit opens or closes, returns a remover"""
+        return self._breaker.add_listener(listener)
+
+    @property
+    def circuit_trips(self) -> int:
+        """Number of times the circuit breaker opened."""
+        return self._breaker.trips
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        """Request and refresh metrics of this account."""
+        return self._metrics
+
+    def getRateLimitState(self) -> dict:
+        """Describe the rate limiter and the requests it held back"""
+        return {
+            "requests_per_minute": self._limiter.rate * 60,
+            "burst": self._limiter.burst,
+            "waiting": self._limiter.waiting,
+            "throttled": self._limiter.throttled,
+        }
+
+    @property
+    def retries(self) -> int:
+        """Number of requests that were retried after a transient failure."""
+        return self._retries
+
+    async def test_authentication(self) -> bool:
         """Test if we can authenticate with the host."""
         try:
-            token = self.getLoginToken(True)
+            token = await self.getLoginToken(True)
             return token is not None
         except Exception:
             _LOGGER.exception("Authentication exception {exception}")
             return False
 
-    def getLoginToken(self, forcelogin=False):
+    async def getLoginToken(self, forcelogin=False):
         """Get the access token for the Watts Smarthome API through login or refresh"""
         now = datetime.now()
 
@@ -48,265 +299,727 @@ class WattsApi:
                 "password": self._password,
                 "client_id": "app-front",
             }
-        elif self._token_expires <= now:
+        else:
             _LOGGER.debug("Refreshing access token")
             payload = {
                 "grant_type": "refresh_token",
                 "refresh_token": self._refresh_token,
                 "client_id": "app-front",
             }
-        else:
-            _LOGGER.debug("Getting token called unneeded.")
 
-        request_token_result = requests.post(
-            url="https://auth.smarthome.wattselectronics.com/realms/watts/protocol/openid-connect/token",
+        status, body = await self._request(
+            "token",
+            url=f"{self._auth_url}/realms/watts/protocol/openid-connect/token",
             data=payload,
+            # Every other request waits for the token
+            priority=Priority.COMMAND,
         )
-
-        if request_token_result.status_code == 200:
-            token = request_token_result.json()["access_token"]
+        if status == 200:
+            try:
+                token_data = json_loads(body)
+                token = token_data["access_token"]
+                token_expires = now + timedelta(seconds=token_data["expires_in"])
+                refresh_token = token_data["refresh_token"]
+                refresh_expires_in = now + timedelta(
+                    seconds=token_data["refresh_expires_in"]
+                )
+            except (KeyError, TypeError, ValueError) as exception:
+                self._metrics.endpoint("token").record_error("malformed")
+                raise WattsDecodeError(
+                    f"Malformed token response: {exception!r}"
+                ) from exception
             self._token = token
-            self._token_expires = now + timedelta(
-                seconds=request_token_result.json()["expires_in"]
-            )
-            self._refresh_token = request_token_result.json()["refresh_token"]
-            self._refresh_expires_in = now + timedelta(
-                seconds=request_token_result.json()["refresh_expires_in"]
-            )
+            self._token_expires = token_expires
+            self._refresh_token = refresh_token
+            self._refresh_expires_in = refresh_expires_in
             _LOGGER.debug(
                 f"Received access token till {self._token_expires}. refresh_token till {self._refresh_expires_in}"
             )
+            self._token_renewal_failures = 0
+            self._scheduleTokenRenewal()
+            if self._token_listener is not None:
+                self._token_listener()
             return token
         _LOGGER.error(
             "Something went wrong fetching the token for type {}: {} {}".format(
                 payload["grant_type"],
-                request_token_result.status_code,
-                request_token_result.json(),
+                status,
+                body.decode(errors="replace"),
             )
         )
         if payload["grant_type"] == "refresh_token":
             _LOGGER.error("Retrying with relogin")
-            return self.getLoginToken(True)
+            return await self.getLoginToken(True)
         return None
 
-    def loadData(self):
+    async def loadData(self):
         """Load data from api"""
-        smarthomes = self.loadSmartHomes()
+        smarthomes = await self.loadSmartHomes()
+        if smarthomes is None:
+            return False
+        # Keep showing the known zones, of a restored snapshot too, until the
+        # homes answer
+        known = {home["smarthome_id"]: home for home in self._smartHomeData or ()}
+        for smartHome in smarthomes:
+            previous = known.get(smartHome["smarthome_id"])
+            if previous is not None and "zones" in previous:
+                smartHome["zones"] = previous["zones"]
         self._smartHomeData = smarthomes
+        # The new smart homes have no zones yet, whatever the devices answer
+        self._fingerprints.clear()
+        self._bodySizes.clear()
+        self._rebuildIndex()
 
-        return self.reloadDevices()
+        return await self.reloadDevices()
 
-    def loadSmartHomes(self, firstTry: bool = True):
+    async def loadSmartHomes(self, firstTry: bool = True):
         """Load the user data"""
-        self._refresh_token_if_expired()
+        await self._refresh_token_if_expired()
 
         headers = {"Authorization": f"Bearer {self._token}"}
         payload = {"token": "true", "email": self._username, "lang": "nl_NL"}
 
-        user_data_result = requests.post(
-            url="https://smarthome.wattselectronics.com/api/v0.1/human/user/read/",
-            headers=headers,
-            data=payload,
+        user_data_result = self.parse_response(
+            *await self._request(
+                "user/read",
+                url=f"{self._api_url}/user/read/",
+                headers=headers,
+                data=payload,
+            ),
+            self._metrics.endpoint("user/read"),
         )
-
-        if self.check_response(user_data_result):
-            return user_data_result.json()["data"]["smarthomes"]
+        if user_data_result is not None:
+            return user_data_result.data["smarthomes"]
 
         return None
 
-    def loadDevices(self, smarthome: str, firstTry: bool = True):
+    async def loadDevices(self, smarthome: str, firstTry: bool = True):
         """Load devices for smart home"""
-        self._refresh_token_if_expired()
+        return self._decodeDevices(*await self._readDevices(smarthome))
+
+    async def _readDevices(self, smarthome: str) -> tuple[int, bytes]:
+        """Fetch the raw devices response of a smart home"""
+        await self._refresh_token_if_expired()
 
         headers = {"Authorization": f"Bearer {self._token}"}
         payload = {"token": "true", "smarthome_id": smarthome, "lang": "nl_NL"}
 
-        devices_result = requests.post(
-            url="https://smarthome.wattselectronics.com/api/v0.1/human/smarthome/read/",
+        _LOGGER.debug("Load devices.")
+        return await self._request(
+            "smarthome/read",
+            url=f"{self._api_url}/smarthome/read/",
             headers=headers,
             data=payload,
         )
-        _LOGGER.debug("Load devices.")
 
-        if self.check_response(devices_result):
-            return devices_result.json()["data"]["zones"]
+    def _decodeDevices(self, status: int, body: bytes):
+        """Decode the zones of a devices response"""
+        devices_result = self.parse_response(
+            status, body, self._metrics.endpoint("smarthome/read")
+        )
+
+        if devices_result is not None:
+            # Decode the devices once, entities read the typed state
+            try:
+                zones = devices_result.data["zones"]
+                for zone in zones or ():
+                    if zone.get("devices") is not None:
+                        zone["devices"] = [
+                            WattsDevice.from_api(device) for device in zone["devices"]
+                        ]
+            except (AttributeError, KeyError, TypeError, ValueError) as exception:
+                self._metrics.endpoint("smarthome/read").record_error("malformed")
+                raise WattsDecodeError(
+                    f"Malformed device record: {exception!r}"
+                ) from exception
+            return zones
 
         return None
 
-    def _refresh_token_if_expired(self) -> None:
+    def exportTokens(self) -> dict | None:
+        """Export the current tokens so they can be persisted"""
+        if self._token is None:
+            return None
+        return {
+            "token": self._token,
+            "token_expires": self._token_expires.isoformat(),
+            "refresh_token": self._refresh_token,
+            "refresh_expires_in": self._refresh_expires_in.isoformat(),
+        }
+
+    def restoreTokens(self, tokens: dict) -> bool:
+        """Restore previously exported tokens, returns False if they are unusable"""
+        try:
+            token_expires = datetime.fromisoformat(tokens["token_expires"])
+            refresh_expires_in = datetime.fromisoformat(tokens["refresh_expires_in"])
+            token = tokens["token"]
+            refresh_token = tokens["refresh_token"]
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.debug("Stored tokens are malformed, ignoring them")
+            return False
+
+        if refresh_expires_in <= datetime.now():
+            _LOGGER.debug("Stored tokens have expired")
+            return False
+
+        self._token = token
+        self._token_expires = token_expires
+        self._refresh_token = refresh_token
+        self._refresh_expires_in = refresh_expires_in
+        _LOGGER.debug(
+            f"Restored access token till {self._token_expires}. refresh_token till {self._refresh_expires_in}"
+        )
+        self._scheduleTokenRenewal()
+        return True
+
+    def exportSnapshot(self) -> dict | None:
+        """Export the smart homes and their devices so they can be persisted"""
+        if not self._smartHomeData:
+            return None
+        smartHomes = []
+        for smartHome in self._smartHomeData:
+            smartHome = dict(smartHome)
+            if smartHome.get("zones") is not None:
+                smartHome["zones"] = [
+                    {
+                        **zone,
+                        "devices": [device.as_dict() for device in zone["devices"]],
+                    }
+                    if zone.get("devices") is not None
+                    else zone
+                    for zone in smartHome["zones"]
+                ]
+            smartHomes.append(smartHome)
+        return {
+            "smarthomes": smartHomes,
+            "last_communication": {
+                smarthome: timestamp.isoformat()
+                for smarthome, timestamp in self._lastCommunication.items()
+            },
+        }
+
+    def restoreSnapshot(self, snapshot: dict) -> bool:
+        """Restore previously exported smart homes, returns False if unusable"""
+        try:
+            smartHomes = snapshot["smarthomes"]
+            for smartHome in smartHomes:
+                for zone in smartHome.get("zones") or ():
+                    if zone.get("devices") is not None:
+                        zone["devices"] = [
+                            WattsDevice.from_dict(device) for device in zone["devices"]
+                        ]
+            lastCommunication = {
+                smarthome: datetime.fromisoformat(timestamp)
+                for smarthome, timestamp in snapshot["last_communication"].items()
+            }
+        except (AttributeError, KeyError, TypeError, ValueError):
+            _LOGGER.debug("Stored snapshot is malformed, ignoring it")
+            return False
+
+        self._smartHomeData = smartHomes
+        # Nothing was read yet, the first refresh decodes every home
+        self._fingerprints.clear()
+        self._bodySizes.clear()
+        # Shown until the first check, which happens on the first refresh
+        self._lastCommunication = lastCommunication
+        self._rebuildIndex()
+        _LOGGER.debug(f"Restored {len(self._deviceIndex)} devices from the snapshot")
+        return True
+
+    def setSnapshotListener(self, listener) -> None:
+        """Set a callback that is called whenever polled devices are merged"""
+        self._snapshot_listener = listener
+
+    def setTokenListener(self, listener) -> None:
+        """Set a callback that is called whenever new tokens are received"""
+        self._token_listener = listener
+
+    def getTokenState(self) -> dict:
+        """Describe the expiry of the tokens, without the tokens themselves"""
+        now = datetime.now()
+
+        def expiry(moment: datetime | None) -> dict:
+            if moment is None:
+                return {"expires": None, "expires_in": None}
+            return {
+                "expires": moment.isoformat(),
+                "expires_in": round((moment - now).total_seconds()),
+            }
+
+        return {
+            "logged_in": self._token is not None,
+            "expired": self._token_expired(),
+            "access_token": expiry(self._token_expires),
+            "refresh_token": expiry(self._refresh_expires_in),
+            "renewal_scheduled": self._cancel_token_renewal is not None,
+            "inline_refreshes": self._inline_token_refreshes,
+        }
+
+    @property
+    def inline_token_refreshes(self) -> int:
+        """Number of token refreshes that happened on the request path."""
+        return self._inline_token_refreshes
+
+    def _scheduleTokenRenewal(self) -> None:
+        """Schedule the token renewal ahead of the expiry of the current tokens."""
+        now = datetime.now()
+        renew_at = self._token_expires - self._token_renew_margin
+        # A refresh grant is useless once the refresh token is gone, log in again
+        relogin_at = self._refresh_expires_in - self._token_renew_margin
+        forcelogin = relogin_at <= renew_at
+        delay = max((min(renew_at, relogin_at) - now).total_seconds(), 0)
+        self._scheduleRenewalIn(delay, forcelogin)
+
+    def _scheduleRenewalIn(self, delay: float, forcelogin: bool) -> None:
+        """Schedule a background token renewal in delay seconds."""
+        self.cancelTokenRenewal()
+
+        @callback
+        def _renew(_now) -> None:
+            self._cancel_token_renewal = None
+            self._token_renewal_task = self._hass.async_create_background_task(
+                self._renewToken(forcelogin), "watts_vision token renewal"
+            )
+
+        _LOGGER.debug(
+            "Scheduling token %s in %s seconds",
+            "login" if forcelogin else "refresh",
+            delay,
+        )
+        self._cancel_token_renewal = async_call_later(self._hass, delay, _renew)
+
+    def cancelTokenRenewal(self) -> None:
+        """Cancel the scheduled token renewal."""
+        if self._cancel_token_renewal is not None:
+            self._cancel_token_renewal()
+            self._cancel_token_renewal = None
+        task, self._token_renewal_task = self._token_renewal_task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+    async def _renewToken(self, forcelogin: bool) -> None:
+        """Renew the tokens in the background before they expire."""
+        async with self._token_lock:
+            try:
+                token = await self.getLoginToken(forcelogin)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Background token renewal failed")
+                token = None
+        if token is None:
+            # The request path falls back to refreshing inline meanwhile
+            self._token_renewal_failures += 1
+            delay = min(
+                TOKEN_RENEW_RETRY_BASE * 2 ** (self._token_renewal_failures - 1),
+                TOKEN_RENEW_RETRY_MAX,
+            )
+            _LOGGER.warning(
+                "Background token renewal did not return a token, retrying in %s seconds",
+                delay,
+            )
+            self._scheduleRenewalIn(delay, forcelogin)
+
+    async def _refresh_token_if_expired(self) -> None:
         """Check if token is expired and request a new one."""
+        if not self._token_expired():
+            return
+
+        # Single flight: the first caller refreshes, concurrent callers wait on
+        # the lock and then find a valid token instead of logging in again.
+        async with self._token_lock:
+            if self._token_expired():
+                self._inline_token_refreshes += 1
+                await self.getLoginToken()
+            else:
+                _LOGGER.debug("Token was refreshed while waiting.")
+
+    def _token_expired(self) -> bool:
+        """Return whether there is no token or the access or refresh token expired."""
         now = datetime.now()
+        return bool(
+            self._token is None
+            or (self._token_expires and self._token_expires <= now)
+            or (self._refresh_expires_in and self._refresh_expires_in <= now)
+        )
 
-        timeout = 10
-        while self._refreshing_token and timeout != 0:
-            _LOGGER.debug("Refresh in action.")
-            time.sleep(1 / 10)
-            --timeout
+    async def reloadDevices(self):
+        """Load devices for each smart home, returns False if none of them loaded"""
+        if self._smartHomeData is None:
+            return False
+        if not self._smartHomeData:
+            return True
 
-        if (self._token_expires and self._token_expires <= now) or (
-            self._refresh_expires_in and self._refresh_expires_in <= now
-        ):
-            self._refreshing_token = True
-            self.getLoginToken()
-            self._refreshing_token = False
-
-    def reloadDevices(self):
-        """Load devices for each smart home"""
-        if self._smartHomeData is not None:
-            for y in range(len(self._smartHomeData)):
-                zones = self.loadDevices(self._smartHomeData[y]["smarthome_id"])
-                if zones != None:
-                    self._smartHomeData[y]["zones"] = zones
+        smartHomes = list(self._smartHomeData)
+        # One home failing must neither abort nor fail the refresh of the others
+        results = await asyncio.gather(
+            *(self._reloadSmartHome(smartHome) for smartHome in smartHomes),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        failed = 0
+        for smartHome, result in zip(smartHomes, results, strict=True):
+            if result is not True:
+                # The home keeps the zones of its last successful load
+                failed += 1
+                _LOGGER.warning(
+                    "Could not load the devices of %s: %s",
+                    smartHome["smarthome_id"],
+                    result or "invalid response",
+                )
+        if len(errors) == len(results):
+            raise errors[0]
+        return failed < len(results)
 
+    async def _reloadSmartHome(self, smartHome: dict):
+        """Load and merge the devices of a single smart home"""
+        smarthome_id = smartHome["smarthome_id"]
+        async with self._reload_semaphore:
+            status, body = await self._readDevices(smarthome_id)
+
+        # Most polls return the same bytes, then there is nothing to decode
+        fingerprint = hash(body)
+        if status == 200 and self._fingerprints.get(smarthome_id) == fingerprint:
+            _LOGGER.debug(f"Devices of {smarthome_id} are unchanged")
+            self._unchangedReads += 1
+            return True
+
+        zones = self._decodeDevices(status, body)
+        # Merge as soon as this home answers, independent of the others
+        if zones is None:
+            return False
+        if self._pendingCommands.has_pending(smarthome_id):
+            # The poll may predate a push, keep the commanded fields until confirmed
+            for zone in zones:
+                if zone.get("devices") is not None:
+                    zone["devices"] = [
+                        self._pendingCommands.reconcile(
+                            (smarthome_id, device.id), device
+                        )
+                        for device in zone["devices"]
+                    ]
+        # A masked home has to be decoded again until its commands are settled
+        if not self._pendingCommands.has_pending(smarthome_id):
+            self._fingerprints[smarthome_id] = fingerprint
+        self._bodySizes[smarthome_id] = len(body)
+        smartHome["zones"] = zones
+        self._rebuildIndex()
+        if self._snapshot_listener is not None:
+            self._snapshot_listener()
         return True
 
+    @property
+    def unchanged_reads(self) -> int:
+        """Number of smarthome/read responses skipped as identical to the last."""
+        return self._unchangedReads
+
+    @property
+    def snapshot_bytes(self) -> int:
+        """Size of the smarthome/read bodies the current devices came from."""
+        return sum(self._bodySizes.values())
+
+    @property
+    def index_version(self) -> int:
+        """Version of the device index, it changes whenever devices are merged."""
+        return self._indexVersion
+
     def getSmartHomes(self):
         """Get smarthomes"""
         return self._smartHomeData
 
-    def getDevice(self, smarthome: str, deviceId: str):
+    def getDevices(self):
+        """Get all devices keyed by (smarthome_id, device id)"""
+        return self._deviceIndex
+
+    def getDevice(self, smarthome: str, deviceId: str) -> WattsDevice | None:
         """Get specific device"""
-        for y in range(len(self._smartHomeData)):
-            if self._smartHomeData[y]["smarthome_id"] == smarthome:
-                for z in range(len(self._smartHomeData[y]["zones"])):
-                    for x in range(len(self._smartHomeData[y]["zones"][z]["devices"])):
-                        if (
-                            self._smartHomeData[y]["zones"][z]["devices"][x]["id"]
-                            == deviceId
-                        ):
-                            return self._smartHomeData[y]["zones"][z]["devices"][x]
+        return self._deviceIndex.get((smarthome, deviceId))
 
-        return None
+    def getZone(self, smarthome: str, zoneLabel: str):
+        """Get specific zone"""
+        return self._zoneIndex.get((smarthome, zoneLabel))
 
-    def setDevice(self, smarthome: str, deviceId: str, newState: str):
+    def setDevice(self, smarthome: str, deviceId: str, newState: WattsDevice):
         """Set specific device"""
-        for y in range(len(self._smartHomeData)):
-            if self._smartHomeData[y]["smarthome_id"] == smarthome:
-                for z in range(len(self._smartHomeData[y]["zones"])):
-                    for x in range(len(self._smartHomeData[y]["zones"][z]["devices"])):
-                        if (
-                            self._smartHomeData[y]["zones"][z]["devices"][x]["id"]
-                            == deviceId
-                        ):
-                            # If device is found, overwrite it with the new state
-                            self._smartHomeData[y]["zones"][z]["devices"][x] = newState
-                            _LOGGER.debug(f"setDevice {deviceId} {newState}")
-                            return self._smartHomeData[y]["zones"][z]["devices"][x]
+        key = (smarthome, deviceId)
+        zone = self._deviceZoneIndex.get(key)
+        if zone is None:
+            return None
 
-        return None
+        # If device is found, overwrite it with the new state
+        devices = zone["devices"]
+        devices[devices.index(self._deviceIndex[key])] = newState
+        self._deviceIndex[key] = newState
+        self._changedDevices.add(key)
+        # The cached state no longer matches the last body, decode the next one
+        self._fingerprints.pop(smarthome, None)
+        _LOGGER.debug(f"setDevice {deviceId} {newState}")
+        return newState
 
-    def pushTemperature(
-        self,
-        smarthome: str,
-        deviceID: str,
-        value: str,
-        gvMode: str,
-        firstTry: bool = True,
-    ):
-        self._refresh_token_if_expired()
+    def applyCommand(
+        self, smarthome: str, deviceId: str, changes: dict
+    ) -> WattsDevice | None:
+        """Set the fields of a command on a device until a poll confirms them"""
+        device = self.getDevice(smarthome, deviceId)
+        if device is None:
+            return None
+        self._pendingCommands.add((smarthome, deviceId), changes)
+        return self.setDevice(smarthome, deviceId, replace(device, **changes))
 
-        headers = {"Authorization": f"Bearer {self._token}"}
-        payload = {
-            "token": "true",
-            "context": "1",
-            "smarthome_id": smarthome,
-            "query[id_device]": deviceID,
-            "query[time_boost]": "0",
-            "query[gv_mode]": gvMode,
-            "query[nv_mode]": gvMode,
-            "peremption": "15000",
-            "lang": "nl_NL",
-        }
-        extrapayload = {}
+    def discardCommand(self, smarthome: str, deviceId: str) -> None:
+        """Stop masking polls with the fields of a failed command"""
+        self._pendingCommands.discard((smarthome, deviceId))
+
+    @property
+    def command_latencies(self) -> list[float]:
+        """Seconds from the last commands until a poll confirmed them."""
+        return list(self._pendingCommands.latencies)
+
+    @property
+    def expired_commands(self) -> int:
+        """Number of commands no poll confirmed before their deadline."""
+        return self._pendingCommands.expired
+
+    def popChangedDevices(self) -> set:
+        """Return and forget the devices replaced through setDevice"""
+        changed, self._changedDevices = self._changedDevices, set()
+        return changed
+
+    def _rebuildIndex(self) -> None:
+        """Rebuild the device and zone lookup tables from the smart home data"""
+        deviceIndex = {}
+        deviceZoneIndex = {}
+        zoneIndex = {}
+        for smartHome in self._smartHomeData or ():
+            smarthome_id = smartHome["smarthome_id"]
+            for zone in smartHome.get("zones") or ():
+                zoneIndex[(smarthome_id, zone["zone_label"])] = zone
+                for device in zone.get("devices") or ():
+                    key = (smarthome_id, device.id)
+                    deviceIndex[key] = device
+                    deviceZoneIndex[key] = zone
+
+        # Swap in the new tables at once so lookups never see a partial index
+        self._deviceIndex = deviceIndex
+        self._deviceZoneIndex = deviceZoneIndex
+        self._zoneIndex = zoneIndex
+        self._indexVersion += 1
+
+    @staticmethod
+    def _commandFields(value: str, gvMode: str) -> dict:
+        """Return the mode specific fields of a push"""
         if gvMode == "0":
-            extrapayload = {
+            return {
                 "query[consigne_confort]": value,
                 "query[consigne_manuel]": value,
             }
         elif gvMode == "1":
-            extrapayload = {
+            return {
                 "query[consigne_manuel]": "0",
             }
         elif gvMode == "2":
-            extrapayload = {
+            return {
                 "query[consigne_hg]": "446",
                 "query[consigne_manuel]": "446",
                 "peremption": "20000",
             }
         elif gvMode == "3":
-            extrapayload = {
+            return {
                 "query[consigne_eco]": value,
                 "query[consigne_manuel]": value,
             }
         elif gvMode == "4":
-            extrapayload = {
+            return {
                 "query[time_boost]": "7200",
                 "query[consigne_boost]": value,
                 "query[consigne_manuel]": value,
             }
         elif gvMode == "11":
-            extrapayload = {
+            return {
                 "query[consigne_manuel]": value,
             }
-        payload.update(extrapayload)
+        return {}
+
+    @classmethod
+    def commandChanges(cls, value: str, gvMode: str) -> dict:
+        """Return the device fields a push sets, as polls report them once applied"""
+        changes = {"gv_mode": gvMode}
+        for field, fieldValue in cls._commandFields(value, gvMode).items():
+            # The boost countdown is never polled back as pushed, leave it out
+            if not field.startswith("query[consigne_"):
+                continue
+            # Off and program push a 0 in place of a setpoint, which polls
+            # never report back
+            if float(fieldValue) == 0:
+                continue
+            changes[field[len("query[") : -1]] = float(fieldValue) / 10
+        return changes
+
+    async def pushTemperature(
+        self,
+        smarthome: str,
+        deviceID: str,
+        value: str,
+        gvMode: str,
+        firstTry: bool = True,
+    ):
+        await self._refresh_token_if_expired()
+
+        headers = {"Authorization": f"Bearer {self._token}"}
+        payload = {
+            "token": "true",
+            "context": "1",
+            "smarthome_id": smarthome,
+            "query[id_device]": deviceID,
+            "query[time_boost]": "0",
+            "query[gv_mode]": gvMode,
+            "query[nv_mode]": gvMode,
+            "peremption": "15000",
+            "lang": "nl_NL",
+        }
+        payload.update(self._commandFields(value, gvMode))
         _LOGGER.debug(
             f"pushTemp {value}. mode {gvMode} smarthome {smarthome} device {deviceID}"
         )
 
-        push_result = requests.post(
-            url="https://smarthome.wattselectronics.com/api/v0.1/human/query/push/",
-            headers=headers,
-            data=payload,
+        push_result = self.parse_response(
+            *await self._request(
+                "query/push",
+                url=f"{self._api_url}/query/push/",
+                headers=headers,
+                data=payload,
+                priority=Priority.COMMAND,
+            ),
+            self._metrics.endpoint("query/push"),
         )
-
-        if self.check_response(push_result):
+        if push_result is not None:
             return True
         _LOGGER.debug("pushTemp failed")
         return False
 
-    def getLastCommunication(self, smarthome: str, firstTry: bool = True):
-        self._refresh_token_if_expired()
+    async def queueTemperature(
+        self, smarthome: str, deviceID: str, value: str, gvMode: str
+    ) -> bool:
+        """Push a temperature command, coalesced with others for the same device"""
+        key = (smarthome, deviceID)
+        queue = self._commandQueues.get(key)
+        if queue is None:
+            queue = self._commandQueues[key] = CommandQueue(
+                self._hass,
+                functools.partial(self.pushTemperature, smarthome, deviceID),
+                self._command_debounce,
+            )
+        return await queue.async_push(value, gvMode)
+
+    async def flushCommands(self) -> None:
+        """Push all queued commands without waiting for their window to end"""
+        await asyncio.gather(
+            *(queue.async_flush() for queue in self._commandQueues.values())
+        )
+
+    async def getLastCommunication(self, smarthome: str, firstTry: bool = True):
+        await self._refresh_token_if_expired()
 
         headers = {"Authorization": f"Bearer {self._token}"}
         payload = {"token": "true", "smarthome_id": smarthome, "lang": "nl_NL"}
 
-        last_connection_result = requests.post(
-            url="https://smarthome.wattselectronics.com/api/v0.1/human/sandbox/check_last_connexion/",
-            headers=headers,
-            data=payload,
+        last_connection_result = self.parse_response(
+            *await self._request(
+                "check_last_connexion",
+                url=f"{self._api_url}/sandbox/check_last_connexion/",
+                headers=headers,
+                data=payload,
+            ),
+            self._metrics.endpoint("check_last_connexion"),
         )
-
-        if self.check_response(last_connection_result):
-            return last_connection_result.json()["data"]
+        if last_connection_result is not None:
+            return last_connection_result.data
 
         return None
 
-    @staticmethod
-    def check_response(response: requests.Response) -> bool:
-        if response.status_code == 200:
-            if "OK" in response.json()["code"]["key"]:
-                return True
-            # raise APIException("Code: {0}, key: {1}, value: {2}".format(
-            #     response.json()["code"]["code"],
-            #     response.json()["code"]["key"],
-            #     response.json()["code"]["value"]
-            # ))
-            _LOGGER.error(
-                "Something went wrong fetching user data. Code: {}, Key: {}, Value: {}, Data: {}".format(
-                    response.json()["code"]["code"],
-                    response.json()["code"]["key"],
-                    response.json()["code"]["value"],
-                    response.json()["data"],
+    async def refreshLastCommunication(self, ttl: float) -> set:
+        """Check the central units not checked for ttl seconds, returns the changed"""
+        now = time.monotonic()
+        due = []
+        for smartHome in self._smartHomeData or ():
+            checked = self._lastCommunicationChecked.get(smartHome["smarthome_id"])
+            if checked is None or now - checked >= ttl:
+                due.append(smartHome["smarthome_id"])
+
+        results = await asyncio.gather(
+            *(self._checkLastCommunication(smarthome) for smarthome in due),
+            return_exceptions=True,
+        )
+
+        changed = set()
+        for smarthome, result in zip(due, results, strict=True):
+            if isinstance(result, Exception):
+                _LOGGER.debug(
+                    f"Last communication check of {smarthome} failed: {result}"
                 )
-            )
+            elif result:
+                changed.add(smarthome)
+        return changed
+
+    async def _checkLastCommunication(self, smarthome: str) -> bool:
+        """Update the last communication of a central unit, True if it changed"""
+        async with self._reload_semaphore:
+            data = await self.getLastCommunication(smarthome)
+        if data is None:
             return False
-        # raise UnHandledStatuException(response.status_code)
-        _LOGGER.error(
-            f"Unexpected status code {response.status_code} {response.json()}"
+        self._lastCommunicationChecked[smarthome] = time.monotonic()
+
+        diff = data["diffObj"]
+        timestamp = dt_util.utcnow().replace(microsecond=0) - timedelta(
+            days=int(diff["days"]),
+            hours=int(diff["hours"]),
+            minutes=int(diff["minutes"]),
+            seconds=int(diff["seconds"]),
         )
+        previous = self._lastCommunication.get(smarthome)
+        # Request latency shifts the computed time by a second or so
+        if previous is not None and abs(timestamp - previous) <= timedelta(seconds=2):
+            return False
+        self._lastCommunication[smarthome] = timestamp
+        return True
 
-        if response.status_code == 401:
-            # raise UnauthorizedException("Unauthorized")
-            _LOGGER.error("Unauthorized")
+    def getLastCommunicationTime(self, smarthome: str) -> datetime | None:
+        """Get the last communication of a central unit, as of its last check"""
+        return self._lastCommunication.get(smarthome)
 
-        return False
+    @staticmethod
+    def parse_response(
+        status: int, body: bytes, metrics: EndpointMetrics | None = None
+    ) -> ApiResponse | None:
+        """Decode a response once, returns None unless the API reports OK"""
+        if status != 200:
+            # raise UnHandledStatuException(response.status)
+            _LOGGER.error(
+                f"Unexpected status code {status} {body.decode(errors='replace')}"
+            )
+            if status == 401:
+                # raise UnauthorizedException("Unauthorized")
+                _LOGGER.error("Unauthorized")
+            return None
+
+        # Home Assistant's json_loads is orjson, several times faster than json
+        try:
+            payload = json_loads(body)
+            code = payload["code"]
+            response = ApiResponse(
+                code["code"], code["key"], code["value"], payload.get("data")
+            )
+        except (ValueError, TypeError, KeyError):
+            _LOGGER.error(f"Malformed response {body.decode(errors='replace')}")
+            if metrics is not None:
+                metrics.record_error("malformed")
+            return None
+
+        if "OK" in response.key:
+            return response
+        if metrics is not None:
+            metrics.record_error(f"key {response.key}")
+        _LOGGER.error(
+            "Something went wrong fetching user data. Code: {}, Key: {}, Value: {}, Data: {}".format(
+                response.code, response.key, response.value, response.data
+            )
+        )
+        return None